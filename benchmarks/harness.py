@@ -0,0 +1,170 @@
+import time
+import asyncio
+import discord
+from dataclasses import dataclass, field
+from typing import Awaitable, Callable
+
+
+class FakeMessage:
+    def __init__(self, interaction: "FakeInteraction"):
+        self._interaction = interaction
+
+    async def edit(self, **kwargs):
+        await self._interaction._http("edit", kwargs)
+
+
+class FakeResponse:
+    def __init__(self, interaction: "FakeInteraction"):
+        self._interaction = interaction
+        self._done = False
+
+    def is_done(self) -> bool:
+        return self._done
+
+    # Как в discord.py: ответ считается отправленным только после возврата запроса
+    async def defer(self, **kwargs):
+        await self._interaction._http("defer", kwargs)
+        self._done = True
+
+    async def send_message(self, content=None, **kwargs):
+        await self._interaction._http("send_message", {"content": content, **kwargs})
+        self._done = True
+
+
+class FakeFollowup:
+    def __init__(self, interaction: "FakeInteraction"):
+        self._interaction = interaction
+
+    async def send(self, content=None, **kwargs):
+        await self._interaction._http("followup", {"content": content, **kwargs})
+        return FakeMessage(self._interaction)
+
+
+class FakeUser:
+    def __init__(self, user_id: int):
+        self.id = user_id
+        self.name = f"user{user_id}"
+
+
+class FakeInteraction:
+    """Минимальная замена ``discord.Interaction`` для вызова колбэков команд.
+
+    Каждый HTTP-вызов к Discord имитируется задержкой ``rtt`` секунд.
+    """
+
+    def __init__(self, user_id: int, rtt: float = 0.0, guild_id: int = 1):
+        self.user = FakeUser(user_id)
+        self.guild_id = guild_id
+        self.guild = None
+        self.extras: dict = {}
+        self.created_at = discord.utils.utcnow()
+        self.command = None
+        self.rtt = rtt
+        self.calls: list[tuple[str, dict]] = []
+        self.response = FakeResponse(self)
+        self.followup = FakeFollowup(self)
+
+    async def _http(self, kind: str, payload: dict) -> None:
+        self.calls.append((kind, payload))
+        if self.rtt:
+            await asyncio.sleep(self.rtt)
+
+    @property
+    def last_content(self) -> str:
+        for _, payload in reversed(self.calls):
+            if payload.get("content"):
+                return payload["content"]
+        return ""
+
+
+class LoopLagMonitor:
+    """Замер задержки цикла событий: насколько позже срабатывает sleep(interval)."""
+
+    def __init__(self, interval: float = 0.01):
+        self.interval = interval
+        self.samples: list[float] = []
+        self._task: asyncio.Task | None = None
+
+    async def _run(self):
+        while True:
+            start = time.perf_counter()
+            await asyncio.sleep(self.interval)
+            self.samples.append(max(0.0, time.perf_counter() - start - self.interval))
+
+    def start(self):
+        self._task = asyncio.get_running_loop().create_task(self._run())
+
+    async def stop(self):
+        self._task.cancel()
+        try:
+            await self._task
+        except asyncio.CancelledError:
+            pass
+
+
+def percentile(values: list[float], q: float) -> float:
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(q * len(ordered)))]
+
+
+@dataclass
+class Result:
+    name: str
+    latencies: list[float] = field(default_factory=list)
+    outcomes: dict[str, int] = field(default_factory=dict)
+    http_calls: int = 0
+    errors: int = 0
+    elapsed: float = 0.0
+    loop_lag: list[float] = field(default_factory=list)
+
+    def report(self) -> str:
+        count = len(self.latencies)
+        outcomes = ", ".join(f"{k} {v}" for k, v in sorted(self.outcomes.items()))
+        return (
+            f"{self.name:<16} {count:>6} запр. {count / self.elapsed if self.elapsed else 0:>9.1f} rps | "
+            f"p50 {percentile(self.latencies, 0.5) * 1000:>8.2f} мс "
+            f"p99 {percentile(self.latencies, 0.99) * 1000:>8.2f} мс "
+            f"max {max(self.latencies, default=0) * 1000:>8.2f} мс | "
+            f"лаг цикла p99 {percentile(self.loop_lag, 0.99) * 1000:.2f} мс "
+            f"max {max(self.loop_lag, default=0) * 1000:.2f} мс | "
+            f"HTTP/запр. {self.http_calls / count if count else 0:.2f} | "
+            f"ошибки {self.errors} | {outcomes}"
+        )
+
+
+async def run_load(
+    name: str,
+    call: Callable[[int], Awaitable[FakeInteraction | None]],
+    requests: int,
+    concurrency: int
+) -> Result:
+    """Выполнение ``requests`` вызовов с ``concurrency`` одновременными."""
+    result = Result(name)
+    semaphore = asyncio.Semaphore(concurrency)
+    monitor = LoopLagMonitor()
+
+    async def one(i: int):
+        async with semaphore:
+            start = time.perf_counter()
+            try:
+                interaction = await call(i)
+            except Exception:
+                result.errors += 1
+                return
+            result.latencies.append(time.perf_counter() - start)
+            if interaction is not None:
+                result.http_calls += len(interaction.calls)
+                outcome = interaction.last_content[:1] or "-"
+                result.outcomes[outcome] = result.outcomes.get(outcome, 0) + 1
+
+    monitor.start()
+    start = time.perf_counter()
+    await asyncio.gather(*(one(i) for i in range(requests)))
+    result.elapsed = time.perf_counter() - start
+    await monitor.stop()
+    result.loop_lag = monitor.samples
+    result.latencies.sort()
+    return result
+
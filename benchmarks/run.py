@@ -0,0 +1,112 @@
+"""Нагрузочный прогон команд бота на локальной SQLite.
+
+Запуск из корня проекта:
+    python -m benchmarks.run --requests 500 --concurrency 50 --rtt 0.05
+"""
+import os
+import types
+import random
+import asyncio
+import argparse
+import tempfile
+import logging
+from utils.database import DatabaseManager
+from utils.hashing import password_hasher
+from utils.helpers import hash_password
+from utils.storage import SQLiteBackend
+from utils.journal import WriteJournal
+from benchmarks.harness import FakeInteraction, run_load
+
+SCENARIOS = ("reg", "changepassword", "autocomplete", "userinfo", "setpassword")
+PASSWORD = "Benchmark1"
+
+
+async def main(args):
+    workdir = tempfile.mkdtemp(prefix="bot-bench-")
+    path = os.path.join(workdir, "bench.sqlite")
+    # Хранилище и журнал задаются до создания DatabaseManager: он берёт общие
+    DatabaseManager._storage = SQLiteBackend(path, size=args.pool_size)
+    DatabaseManager._journal = WriteJournal(os.path.join(workdir, "journal.jsonl"))
+    password_hasher.rounds = args.bcrypt_rounds
+
+    from cogs.registration import Registration
+    from cogs.admin import AdminTools
+    db = DatabaseManager()
+    bot = types.SimpleNamespace(db=db)
+    registration = Registration(bot)
+    admin = AdminTools(bot)
+    await db.migrate()
+
+    # Заготовка пользователей для сценариев чтения и смены пароля
+    seed_hash = hash_password(PASSWORD, args.bcrypt_rounds)
+    seeded = [
+        (f"seed_{i}", seed_hash, 10_000_000 + i, "default", f"seed-token-{i}")
+        for i in range(args.seed_users)
+    ]
+    with db.get_cursor() as cursor:
+        cursor.executemany(
+            """INSERT INTO users (username, password, discord_id, serverID, accessToken)
+            VALUES (?, ?, ?, ?, ?)""",
+            seeded
+        )
+    await db.reload_login_index()
+
+    def interaction(user_id: int) -> FakeInteraction:
+        return FakeInteraction(user_id, rtt=args.rtt)
+
+    async def reg(i):
+        it = interaction(i)
+        await registration.register.callback(registration, it, f"bench_{i}", PASSWORD)
+        return it
+
+    async def changepassword(i):
+        it = interaction(10_000_000 + i % args.seed_users)
+        await registration.change_password.callback(registration, it, PASSWORD, PASSWORD)
+        return it
+
+    async def autocomplete(i):
+        await admin.login_autocomplete(interaction(i), f"seed_{random.randrange(args.seed_users)}"[:6])
+        return None
+
+    async def userinfo(i):
+        it = interaction(i)
+        await admin.user_info.callback(admin, it, f"seed_{random.randrange(args.seed_users)}")
+        return it
+
+    async def setpassword(i):
+        it = interaction(i)
+        await admin.admin_set_password.callback(
+            admin, it, f"seed_{random.randrange(args.seed_users)}", PASSWORD
+        )
+        return it
+
+    calls = {
+        "reg": reg,
+        "changepassword": changepassword,
+        "autocomplete": autocomplete,
+        "userinfo": userinfo,
+        "setpassword": setpassword,
+    }
+    print(f"БД: {path} | запросов: {args.requests} | параллельно: {args.concurrency} | "
+          f"RTT: {args.rtt * 1000:.0f} мс | bcrypt: {args.bcrypt_rounds}")
+    for name in args.scenarios:
+        result = await run_load(name, calls[name], args.requests, args.concurrency)
+        print(result.report())
+    password_hasher.shutdown()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("scenarios", nargs="*", metavar="scenario", help=f"из {', '.join(SCENARIOS)}")
+    parser.add_argument("--requests", type=int, default=200)
+    parser.add_argument("--concurrency", type=int, default=20)
+    parser.add_argument("--rtt", type=float, default=0.0, help="имитация задержки HTTP к Discord, с")
+    parser.add_argument("--seed-users", type=int, default=1000)
+    parser.add_argument("--pool-size", type=int, default=10)
+    parser.add_argument("--bcrypt-rounds", type=int, default=password_hasher.rounds)
+    args = parser.parse_args()
+    args.scenarios = args.scenarios or list(SCENARIOS)
+    if unknown := set(args.scenarios) - set(SCENARIOS):
+        parser.error(f"неизвестные сценарии: {', '.join(sorted(unknown))}")
+    logging.basicConfig(level=logging.WARNING)
+    asyncio.run(main(args))
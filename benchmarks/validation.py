@@ -0,0 +1,97 @@
+"""Микробенчмарк проверки логинов и паролей: стоимость вызова и выделения памяти.
+
+Сравнивает ``utils.validation`` с прежними реализациями из ``utils.helpers``.
+
+Запуск из корня проекта:
+    python -m benchmarks.validation --number 200000
+"""
+import os
+import re
+import timeit
+import argparse
+import tempfile
+import tracemalloc
+from typing import Callable, Optional
+from utils.validation import BloomFilter, ValidationPolicy, _line_digest
+
+
+def legacy_validate_username(username: str) -> Optional[str]:
+    if not 3 <= len(username) <= 16:
+        return "Длина логина должна быть от 3 до 16 символов"
+    if not re.match(r"^[a-zA-Z0-9_]+$", username):
+        return "Логин может содержать только буквы, цифры и подчёркивание"
+    return None
+
+
+def legacy_validate_password(password: str) -> Optional[str]:
+    if len(password) < 8:
+        return "Пароль должен содержать минимум 8 символов"
+    if not any(c.isupper() for c in password):
+        return "Пароль должен содержать хотя бы одну заглавную букву"
+    if not any(c.isdigit() for c in password):
+        return "Пароль должен содержать хотя бы одну цифру"
+    return None
+
+
+CASES = {
+    "логин (верный)": "Player_2024",
+    "логин (недопустимый)": "bad-name!",
+    "пароль (верный)": "correcthorsebatterystapleX1",
+    "пароль (без цифры)": "correcthorsebatterystapleX",
+}
+
+
+def measure(func: Callable, arg: str, number: int) -> tuple[float, float]:
+    """Наносекунды на вызов и байты, выделенные за вызов (после прогрева)."""
+    func(arg)
+    seconds = min(timeit.repeat(lambda: func(arg), number=number, repeat=3))
+    tracemalloc.start()
+    before = tracemalloc.get_traced_memory()[0]
+    tracemalloc.reset_peak()
+    for _ in range(1000):
+        func(arg)
+    peak = tracemalloc.get_traced_memory()[1] - before
+    tracemalloc.stop()
+    return seconds / number * 1e9, peak / 1000
+
+
+def main(args):
+    workdir = tempfile.mkdtemp(prefix="bot-validation-")
+    bloom_path = os.path.join(workdir, "breached.bloom")
+    words = [f"leaked{i}" for i in range(args.bloom_size)]
+    BloomFilter.build((_line_digest(word) for word in words), len(words), bloom_path)
+    bloom = BloomFilter(bloom_path)
+
+    policy = ValidationPolicy(blocked_names=["admin", "root"])
+    with_bloom = ValidationPolicy(blocked_names=["admin", "root"], breached=bloom)
+    contenders = {
+        "логин": [
+            ("прежняя", legacy_validate_username),
+            ("новая", policy.validate_username),
+        ],
+        "пароль": [
+            ("прежняя", legacy_validate_password),
+            ("новая", policy.validate_password),
+            ("новая + Блум", with_bloom.validate_password),
+        ],
+    }
+
+    print(f"{'случай':<24} {'реализация':<14} {'нс/вызов':>10} {'байт/вызов':>11}")
+    for case, value in CASES.items():
+        kind = case.split()[0]
+        for name, func in contenders[kind]:
+            ns, allocated = measure(func, value, args.number)
+            print(f"{case:<24} {name:<14} {ns:>10.0f} {allocated:>11.1f}")
+
+    false_positives = sum(f"clean{i}" in bloom for i in range(10000))
+    print(f"\nФильтр Блума: {len(words)} паролей, {os.path.getsize(bloom_path)} байт, "
+          f"ложных срабатываний {false_positives / 100:.2f}% "
+          f"(все утёкшие найдены: {all(word in bloom for word in words[:1000])})")
+    bloom.close()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--number", type=int, default=100_000)
+    parser.add_argument("--bloom-size", type=int, default=100_000)
+    main(parser.parse_args())
@@ -1,5 +1,3 @@
 # ъуъ
-from .admin import AdminTools
-from .registration import Registration
-
-__all__ = ["AdminTools", "Registration"]
\ No newline at end of file
+# Коги загружаются через bot.load_extension по одному (см. EXTENSIONS в main.py):
+# без реэкспортов здесь импорт каждого кога учитывается в его собственном этапе старта
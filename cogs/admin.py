@@ -1,9 +1,18 @@
 import discord
-from discord.ext import commands
+from discord.ext import commands, tasks
 from discord import app_commands
+import io
+import os
+import csv
 import logging
-from utils.database import DatabaseManager
-from utils.helpers import validate_password, hash_password, generate_error_code
+import tempfile
+from typing import AsyncIterator
+from utils.database import DatabaseManager, QUEUED, EXPLAIN_CASES, escape_like, require_database
+from utils.ratelimit import rate_limit
+from utils.interactions import Responder
+from utils.hashing import password_hasher, HashingBusyError
+from utils.helpers import generate_error_code, generate_password
+from utils.validation import validate_password
 from config import Config
 
 logger = logging.getLogger("discord_bot")
@@ -11,19 +20,40 @@ logger = logging.getLogger("discord_bot")
 class AdminTools(commands.Cog):
     def __init__(self, bot):
         self.bot = bot
-        self.db = DatabaseManager()
+        self.db: DatabaseManager = bot.db  # общий для всех когов
         self.admin_role_id = Config.ADMIN_ROLE_ID
+        self.refresh_login_index.change_interval(seconds=Config.LOGIN_INDEX_REFRESH)
+
+    async def cog_load(self):
+        self.refresh_login_index.start()
+
+    async def cog_unload(self):
+        self.refresh_login_index.cancel()
+
+    @tasks.loop(seconds=300)
+    async def refresh_login_index(self):
+        """Загрузка и периодическая сверка индекса логинов с БД."""
+        try:
+            count = await self.db.reload_login_index()
+            logger.info(f"Индекс логинов обновлён: {count}")
+        except Exception as e:
+            logger.error(f"Не удалось обновить индекс логинов: {str(e)}")
+
+    @refresh_login_index.before_loop
+    async def before_refresh_login_index(self):
+        # Первая загрузка — после миграций, которые идут параллельно с загрузкой модулей
+        await self.bot.db_ready.wait()
 
     async def login_autocomplete(
         self, 
         interaction: discord.Interaction,
         current: str
     ) -> list[app_commands.Choice[str]]:
-        """Автодополнение логинов из базы данных."""
-        if not self.db.is_connected():
+        """Автодополнение логинов из индекса (или из БД, пока индекс не загружен)."""
+        if not self.db.login_index.loaded and not self.db.available:
             return [app_commands.Choice(name="🚨 Нет подключения к БД", value="error")]
         
-        logins = self.db.search_logins(current)
+        logins = await self.db.search_logins(current)
         return [app_commands.Choice(name=login, value=login) for login in logins[:25]]
 
     @app_commands.command(
@@ -32,6 +62,7 @@ class AdminTools(commands.Cog):
     )
     @app_commands.describe(username="Логин пользователя")
     @app_commands.autocomplete(username=login_autocomplete)
+    @require_database()
     @app_commands.checks.has_permissions(administrator=True)
     async def delete_user(
         self,
@@ -39,19 +70,23 @@ class AdminTools(commands.Cog):
         username: str
     ):
         """Удаление пользователя из базы данных."""
-        await interaction.response.defer(ephemeral=True)
+        reply = Responder(interaction)
+        await reply.prepare(self.db.expected_seconds())
         try:
-            deleted = self.db.delete_user(username)
-            if deleted:
+            deleted = await self.db.delete_user(username)
+            if deleted == QUEUED:
+                msg = f"⏳ Аккаунт **{username}** будет удалён после восстановления БД"
+                logger.warning(f"Удаление отложено: {username}")
+            elif deleted:
                 msg = f"✅ Аккаунт **{username}** удалён!"
                 logger.warning(f"Удалён пользователь: {username}")
             else:
                 msg = "❌ Пользователь не найден"
-            await interaction.followup.send(msg, ephemeral=True)
+            await reply.send(msg)
         except Exception as e:
             error_code = generate_error_code()
-            logger.error(f"{error_code} | {str(e)}", exc_info=True)
-            await interaction.followup.send(f"🚨 Ошибка {error_code}", ephemeral=True)
+            logger.error(f"{error_code} | {str(e)}", exc_info=True, extra={"error_code": error_code})
+            await reply.send(f"🚨 Ошибка {error_code}")
 
     @app_commands.command(
         name="userinfo",
@@ -59,6 +94,7 @@ class AdminTools(commands.Cog):
     )
     @app_commands.describe(username="Логин пользователя")
     @app_commands.autocomplete(username=login_autocomplete)
+    @require_database()
     @app_commands.checks.has_permissions(administrator=True)
     async def user_info(
         self,
@@ -66,29 +102,23 @@ class AdminTools(commands.Cog):
         username: str
     ):
         """Получение информации о пользователе."""
-        await interaction.response.defer(ephemeral=True)
+        reply = Responder(interaction)
+        await reply.prepare(self.db.expected_seconds())
         try:
-            with self.db.get_cursor() as cursor:
-                cursor.execute(
-                    """SELECT uuid, discord_id, serverID 
-                    FROM users 
-                    WHERE username = ?""",
-                    (username,)
-                )
-                result = cursor.fetchone()
-                if result:
-                    uuid, discord_id, server_id = result
-                    embed = discord.Embed(title=f"Информация о {username}", color=0x00ff00)
-                    embed.add_field(name="UUID", value=f"`{uuid}`", inline=False)
-                    embed.add_field(name="Discord ID", value=f"`{discord_id}`", inline=False)
-                    embed.add_field(name="Сервер", value=server_id, inline=False)
-                    await interaction.followup.send(embed=embed, ephemeral=True)
-                else:
-                    await interaction.followup.send("🔍 Пользователь не найден", ephemeral=True)
+            result = await self.db.get_user_info(username)
+            if result:
+                uuid, discord_id, server_id = result
+                embed = discord.Embed(title=f"Информация о {username}", color=0x00ff00)
+                embed.add_field(name="UUID", value=f"`{uuid}`", inline=False)
+                embed.add_field(name="Discord ID", value=f"`{discord_id}`", inline=False)
+                embed.add_field(name="Сервер", value=server_id, inline=False)
+                await reply.send(embed=embed)
+            else:
+                await reply.send("🔍 Пользователь не найден")
         except Exception as e:
             error_code = generate_error_code()
-            logger.error(f"{error_code} | {str(e)}", exc_info=True)
-            await interaction.followup.send(f"🚨 Ошибка {error_code}", ephemeral=True)
+            logger.error(f"{error_code} | {str(e)}", exc_info=True, extra={"error_code": error_code})
+            await reply.send(f"🚨 Ошибка {error_code}")
 
     @app_commands.command(
         name="setpassword",
@@ -96,9 +126,11 @@ class AdminTools(commands.Cog):
     )
     @app_commands.describe(
         username="Логин пользователя",
-        new_password="Новый пароль (мин. 8 символов)"
+        new_password=f"Новый пароль (мин. {Config.PASSWORD_MIN_LENGTH} символов)"
     )
     @app_commands.autocomplete(username=login_autocomplete)
+    @rate_limit("setpassword")
+    @require_database()
     @app_commands.checks.has_permissions(administrator=True)
     async def admin_set_password(
         self,
@@ -107,23 +139,306 @@ class AdminTools(commands.Cog):
         new_password: str
     ):
         """Принудительная смена пароля администратором."""
-        await interaction.response.defer(ephemeral=True)
+        reply = Responder(interaction)
         try:
             if error := validate_password(new_password):
-                return await interaction.followup.send(f"❌ {error}", ephemeral=True)
-            
-            new_hash = hash_password(new_password)
-            success = self.db.update_password(username, new_hash)
-            if success:
+                return await reply.send(f"❌ {error}")
+
+            await reply.prepare(password_hasher.expected_seconds() + self.db.expected_seconds())
+            new_hash = await password_hasher.hash(new_password, interaction.user.id)
+            success = await self.db.update_password(username, new_hash, notify=interaction.user.id)
+            if success == QUEUED:
+                msg = f"⏳ Пароль для **{username}** будет изменён после восстановления БД"
+                logger.warning(f"Админ сменил пароль (отложено): {username}")
+            elif success:
                 msg = f"✅ Пароль для **{username}** изменён!"
                 logger.warning(f"Админ сменил пароль: {username}")
             else:
                 msg = "❌ Пользователь не найден"
-            await interaction.followup.send(msg, ephemeral=True)
+            await reply.send(msg)
+        except HashingBusyError:
+            await reply.send("⏳ Сервер перегружен, повторите попытку позже")
+        except Exception as e:
+            error_code = generate_error_code()
+            logger.error(f"{error_code} | {str(e)}", exc_info=True, extra={"error_code": error_code})
+            await reply.send(f"🚨 Ошибка {error_code}")
+
+    async def _read_targets(
+        self,
+        file: discord.Attachment | None,
+        pattern: str | None
+    ) -> tuple[int, AsyncIterator[list[list[str]]]]:
+        """Число целей и их порции: строки CSV/списка из вложения или логины по шаблону (* и ?).
+
+        Вложение ограничено ``BULK_MAX_FILE_SIZE`` и разбирается целиком — число
+        строк нужно заранее для подтверждения и прогресса; логины по шаблону
+        читаются из БД порциями.
+        """
+        chunk_size = Config.BULK_CHUNK_SIZE
+        if file is not None:
+            if file.size > Config.BULK_MAX_FILE_SIZE:
+                raise ValueError(f"Файл слишком большой (макс. {Config.BULK_MAX_FILE_SIZE // 1024}KB)")
+            content = (await file.read()).decode("utf-8-sig")
+            rows = [
+                [cell.strip() for cell in row]
+                for row in csv.reader(io.StringIO(content))
+                if row and row[0].strip()
+            ]
+            if rows and rows[0][0].lower() == "username":
+                rows = rows[1:]
+
+            async def file_chunks():
+                for i in range(0, len(rows), chunk_size):
+                    yield rows[i:i + chunk_size]
+            return len(rows), file_chunks()
+
+        like = escape_like(pattern).replace("*", "%").replace("?", "_")
+
+        async def pattern_chunks():
+            async for logins in self.db.iter_logins(like, chunk_size):
+                yield [[login] for login in logins]
+        return await self.db.count_logins(like), pattern_chunks()
+
+    @app_commands.command(
+        name="bulkdelete",
+        description="[ADMIN] Массовое удаление аккаунтов"
+    )
+    @app_commands.describe(
+        file="CSV или список логинов (по одному в строке)",
+        pattern="Шаблон логина (* — любые символы, ? — один символ)",
+        confirm="Число аккаунтов из предупреждения: подтверждение большого удаления"
+    )
+    @require_database()
+    @app_commands.checks.has_permissions(administrator=True)
+    async def bulk_delete(
+        self,
+        interaction: discord.Interaction,
+        file: discord.Attachment | None = None,
+        pattern: str | None = None,
+        confirm: int | None = None
+    ):
+        """Удаление аккаунтов из файла или по шаблону порциями."""
+        reply = Responder(interaction)
+        if (file is None) == (pattern is None):
+            return await reply.send("❌ Укажите либо файл, либо шаблон")
+        # Прогресс правится в сообщении followup, поэтому defer сразу
+        await reply.defer()
+        try:
+            total, chunks = await self._read_targets(file, pattern)
+            if total > Config.BULK_CONFIRM_THRESHOLD and confirm != total:
+                return await reply.send(
+                    f"⚠️ Будет удалено аккаунтов: {total}. "
+                    f"Для подтверждения повторите команду с `confirm:{total}`"
+                )
+            progress = await reply.send(f"⏳ Удаление: 0/{total}", wait=True)
+            deleted = queued = done = 0
+            async for chunk in chunks:
+                result = await self.db.delete_users([row[0] for row in chunk])
+                if result == QUEUED:
+                    queued += len(chunk)
+                else:
+                    deleted += result
+                done += len(chunk)
+                await progress.edit(content=f"⏳ Удаление: {done}/{total}")
+            summary = f"✅ Удалено аккаунтов: {deleted} из {total}"
+            if queued:
+                summary += f", отложено до восстановления БД: {queued}"
+            await progress.edit(content=summary)
+            logger.warning(f"Массовое удаление: {deleted} аккаунтов")
+        except ValueError as e:
+            await reply.send(f"❌ {e}")
+        except Exception as e:
+            error_code = generate_error_code()
+            logger.error(f"{error_code} | {str(e)}", exc_info=True, extra={"error_code": error_code})
+            await reply.send(f"🚨 Ошибка {error_code}")
+
+    @app_commands.command(
+        name="bulkpassword",
+        description="[ADMIN] Массовая смена паролей"
+    )
+    @app_commands.describe(
+        file="CSV «логин,пароль» или список логинов (пароли будут сгенерированы)",
+        pattern="Шаблон логина (* и ?), пароли будут сгенерированы",
+        confirm="Число аккаунтов из предупреждения: подтверждение большой смены"
+    )
+    @rate_limit("bulkpassword")
+    @require_database()
+    @app_commands.checks.has_permissions(administrator=True)
+    async def bulk_set_password(
+        self,
+        interaction: discord.Interaction,
+        file: discord.Attachment | None = None,
+        pattern: str | None = None,
+        confirm: int | None = None
+    ):
+        """Смена паролей порциями с параллельным хешированием."""
+        reply = Responder(interaction)
+        if (file is None) == (pattern is None):
+            return await reply.send("❌ Укажите либо файл, либо шаблон")
+        await reply.defer()
+        try:
+            total, chunks = await self._read_targets(file, pattern)
+            if total > Config.BULK_CONFIRM_THRESHOLD and confirm != total:
+                return await reply.send(
+                    f"⚠️ Будут изменены пароли аккаунтов: {total}. "
+                    f"Для подтверждения повторите команду с `confirm:{total}`"
+                )
+            progress = await reply.send(f"⏳ Смена паролей: 0/{total}", wait=True)
+            updated = skipped = missing = queued = done = 0
+            generated = []
+            async for chunk in chunks:
+                requested = {row[0].lower(): row for row in chunk}
+                targets = []
+                for login in await self.db.filter_existing_logins([row[0] for row in chunk]):
+                    # Сравнение в БД может не учитывать акценты: такой логин не сопоставить
+                    row = requested.pop(login.lower(), None)
+                    if row is None:
+                        continue
+                    if len(row) > 1 and row[1]:
+                        if validate_password(row[1]):
+                            skipped += 1
+                            continue
+                        targets.append((login, row[1], False))
+                    else:
+                        targets.append((login, generate_password(), True))
+                missing += len(requested)
+
+                hashes = await password_hasher.hash_many([password for _, password, _ in targets])
+                result = await self.db.update_passwords(
+                    [(login, new_hash) for (login, _, _), new_hash in zip(targets, hashes)],
+                    notify=interaction.user.id
+                )
+                if result == QUEUED:
+                    queued += len(targets)
+                else:
+                    updated += result
+                generated += [(login, password) for login, password, is_new in targets if is_new]
+                done += len(chunk)
+                await progress.edit(content=f"⏳ Смена паролей: {done}/{total}")
+
+            summary = f"✅ Пароли изменены: {updated} из {total}"
+            if skipped:
+                summary += f", пропущено (слабый пароль): {skipped}"
+            if missing:
+                summary += f", не найдено: {missing}"
+            if queued:
+                summary += f", отложено до восстановления БД: {queued}"
+            attachments = []
+            if generated:
+                buffer = io.StringIO()
+                writer = csv.writer(buffer)
+                writer.writerow(["username", "password"])
+                writer.writerows(generated)
+                attachments.append(discord.File(
+                    io.BytesIO(buffer.getvalue().encode("utf-8")),
+                    filename="passwords.csv"
+                ))
+            await progress.edit(content=summary, attachments=attachments)
+            logger.warning(f"Массовая смена паролей: {updated} аккаунтов")
+        except ValueError as e:
+            await reply.send(f"❌ {e}")
+        except Exception as e:
+            error_code = generate_error_code()
+            logger.error(f"{error_code} | {str(e)}", exc_info=True, extra={"error_code": error_code})
+            await reply.send(f"🚨 Ошибка {error_code}")
+
+    @app_commands.command(
+        name="exportusers",
+        description="[ADMIN] Выгрузка пользователей в CSV"
+    )
+    @app_commands.describe(include_hashes="Добавить хеши паролей (для переноса)")
+    @require_database()
+    @app_commands.checks.has_permissions(administrator=True)
+    async def export_users(
+        self,
+        interaction: discord.Interaction,
+        include_hashes: bool = False
+    ):
+        """Потоковая выгрузка таблицы users во временный файл."""
+        reply = Responder(interaction)
+        await reply.defer()
+        fd, path = tempfile.mkstemp(suffix=".csv")
+        os.close(fd)
+        try:
+            count = await self.db.export_users(path, include_hashes)
+            limit = interaction.guild.filesize_limit if interaction.guild else 10 * 1024 * 1024
+            if os.path.getsize(path) > limit:
+                return await reply.send("❌ Выгрузка превышает лимит вложений Discord")
+            await reply.send(
+                f"✅ Выгружено пользователей: {count}",
+                file=discord.File(path, filename="users.csv")
+            )
+            logger.warning(f"Выгрузка пользователей: {count} (хеши: {include_hashes})")
+        except Exception as e:
+            error_code = generate_error_code()
+            logger.error(f"{error_code} | {str(e)}", exc_info=True, extra={"error_code": error_code})
+            await reply.send(f"🚨 Ошибка {error_code}")
+        finally:
+            os.remove(path)
+
+    @app_commands.command(
+        name="dbstats",
+        description="[ADMIN] Статистика пула соединений и кеша БД"
+    )
+    @app_commands.checks.has_permissions(administrator=True)
+    async def db_stats(self, interaction: discord.Interaction):
+        """Вывод статистики пула соединений и кеша."""
+        stats = self.db.pool_stats()
+        embed = discord.Embed(title=f"Пул соединений БД ({self.db.storage.name})", color=0x00ff00)
+        embed.add_field(name="Занято", value=f"{stats['in_use']}/{stats['max_size']}")
+        embed.add_field(name="Свободно", value=str(stats["idle"]))
+        embed.add_field(name="Ожидают", value=str(stats["waiters"]))
+        embed.add_field(name="Выдач", value=str(stats["checkouts"]))
+        embed.add_field(name="Таймауты", value=str(stats["timeouts"]))
+        embed.add_field(name="Пересоздано", value=str(stats["recycled"]))
+        embed.add_field(name="Состояние", value=self.db.breaker.state)
+        embed.add_field(name="В журнале", value=str(len(self.db.journal)))
+        embed.add_field(
+            name="Ожидание соединения",
+            value=f"ср. {stats['checkout_avg_ms']:.2f} мс / макс. {stats['checkout_max_ms']:.2f} мс",
+            inline=False
+        )
+
+        cache = self.db.cache_stats()
+        embed.add_field(
+            name="Кеш пользователей",
+            value=(
+                f"попадания {cache['hits']} / промахи {cache['misses']} "
+                f"({cache['hit_rate']:.0%}), записей {cache['size']}/{cache['maxsize']}, "
+                f"отрицательных {cache['negative_size']}"
+            ),
+            inline=False
+        )
+        await interaction.response.send_message(embed=embed, ephemeral=True)
+
+    @app_commands.command(
+        name="explain",
+        description="[ADMIN] Проверить планы запросов к БД"
+    )
+    @require_database()
+    @app_commands.checks.has_permissions(administrator=True)
+    async def explain_queries(self, interaction: discord.Interaction):
+        """EXPLAIN каждого запроса DatabaseManager с поиском полных проходов."""
+        reply = Responder(interaction)
+        await reply.prepare(self.db.expected_seconds(len(EXPLAIN_CASES)))
+        try:
+            results = await self.db.explain_queries()
+            lines = []
+            for name, plan, full_scan, scan_expected in results:
+                if full_scan and not scan_expected:
+                    logger.warning(f"Полный проход таблицы в запросе {name}: {'; '.join(plan)}")
+                mark = "⚠️" if full_scan and not scan_expected else "✅"
+                lines.append(f"{mark} `{name}`: {'; '.join(plan)}")
+            embed = discord.Embed(
+                title=f"Планы запросов ({self.db.storage.name})",
+                description="\n".join(lines)[:4096],
+                color=0xff0000 if any(line.startswith("⚠️") for line in lines) else 0x00ff00
+            )
+            await reply.send(embed=embed)
         except Exception as e:
             error_code = generate_error_code()
-            logger.error(f"{error_code} | {str(e)}", exc_info=True)
-            await interaction.followup.send(f"🚨 Ошибка {error_code}", ephemeral=True)
+            logger.error(f"{error_code} | {str(e)}", exc_info=True, extra={"error_code": error_code})
+            await reply.send(f"🚨 Ошибка {error_code}")
 
 async def setup(bot):
     await bot.add_cog(AdminTools(bot))
@@ -0,0 +1,121 @@
+import discord
+from discord.ext import commands, tasks
+from discord import app_commands
+import time
+import asyncio
+import logging
+from aiohttp import web
+from utils.database import DatabaseManager
+from utils.metrics import metrics
+from utils.helpers import get_rss_bytes
+from config import Config
+
+logger = logging.getLogger("discord_bot")
+
+LAG_PROBE = 0.05  # секунд сна при замере задержки цикла
+
+class Monitoring(commands.Cog):
+    def __init__(self, bot):
+        self.bot = bot
+        self.db: DatabaseManager = bot.db  # общий для всех когов
+        self.runner: web.AppRunner | None = None
+
+    async def cog_load(self):
+        self.health_loop.change_interval(seconds=Config.DB_HEALTH_INTERVAL)
+        self.health_loop.start()
+        if not metrics.enabled:
+            return
+        metrics.add_collector(self.collect_pool_stats)
+        metrics.add_collector(lambda: metrics.process_rss_bytes.set(get_rss_bytes()))
+        self.sample_loop.start()
+
+        app = web.Application()
+        app.router.add_get("/metrics", self.handle_metrics)
+        self.runner = web.AppRunner(app, access_log=None)
+        await self.runner.setup()
+        await web.TCPSite(self.runner, Config.METRICS_HOST, Config.METRICS_PORT).start()
+        logger.info(f"Метрики доступны на http://{Config.METRICS_HOST}:{Config.METRICS_PORT}/metrics")
+
+    async def cog_unload(self):
+        self.health_loop.cancel()
+        self.sample_loop.cancel()
+        if self.runner is not None:
+            await self.runner.cleanup()
+
+    async def handle_metrics(self, request: web.Request) -> web.Response:
+        return web.Response(text=metrics.render(), content_type="text/plain", charset="utf-8")
+
+    def collect_pool_stats(self):
+        """Перенос статистики пула в метрики."""
+        for stat, value in self.db.pool_stats().items():
+            metrics.db_pool.set(value, stat=stat)
+
+    @tasks.loop(seconds=10)
+    async def health_loop(self):
+        """Фоновая проверка БД вместо проверок внутри команд."""
+        # Цикл должен пережить любую ошибку: только он применяет журнал записей
+        try:
+            available = await self.db.health_check()
+        except Exception as e:
+            logger.error(f"Ошибка фоновой проверки БД: {str(e)}", exc_info=True)
+            available = False
+        if metrics.enabled:
+            metrics.db_up.set(1 if available else 0)
+
+    @health_loop.before_loop
+    async def before_health_loop(self):
+        # Первая проверка — после прогрева и миграций при старте
+        await self.bot.db_ready.wait()
+
+    @tasks.loop(seconds=1)
+    async def sample_loop(self):
+        """Замер задержки цикла событий и шлюза."""
+        # Задержка — насколько позже срока просыпается sleep: sleep(0) её не видит
+        start = time.perf_counter()
+        await asyncio.sleep(LAG_PROBE)
+        metrics.loop_lag_seconds.set(max(0.0, time.perf_counter() - start - LAG_PROBE))
+        if self.bot.latency == self.bot.latency:  # NaN до первого heartbeat
+            metrics.gateway_latency_seconds.set(self.bot.latency)
+
+    @app_commands.command(
+        name="stats",
+        description="[ADMIN] Время выполнения команд и запросов"
+    )
+    @app_commands.checks.has_permissions(administrator=True)
+    async def stats(self, interaction: discord.Interaction):
+        """Сводка метрик."""
+        embed = discord.Embed(title="Статистика бота", color=0x00ff00)
+        embed.add_field(name="Шлюз", value=f"{self.bot.latency * 1000:.0f} мс")
+        embed.add_field(name="Память (RSS)", value=f"{get_rss_bytes() / 1024 / 1024:.1f} МБ")
+        embed.add_field(name="БД", value=self.db.breaker.state)
+        if not metrics.enabled:
+            embed.description = "Метрики отключены (METRICS_ENABLED=false)"
+            return await interaction.response.send_message(embed=embed, ephemeral=True)
+
+        snapshot = metrics.snapshot()
+        embed.add_field(name="Задержка цикла", value=f"{snapshot['loop_lag'] * 1000:.2f} мс")
+
+        def fmt(summary):
+            return (
+                f"{summary['count']} шт., ср. {summary['avg'] * 1000:.0f} мс, "
+                f"p50 ≤{summary['p50'] * 1000:.0f} мс, p99 ≤{summary['p99'] * 1000:.0f} мс"
+            )
+
+        commands_text = "\n".join(
+            f"`{name}` {fmt(summary)}" for name, summary in sorted(snapshot["commands"].items())
+        )
+        phases_text = "\n".join(
+            f"`{command}` {phase}: {fmt(summary)}"
+            for (command, phase), summary in sorted(snapshot["phases"].items())
+        )
+        queries_text = "\n".join(
+            f"`{name}` {fmt(summary)}" for name, summary in sorted(snapshot["queries"].items())
+        )
+        embed.add_field(name="Команды", value=commands_text[:1024] or "—", inline=False)
+        embed.add_field(name="Этапы", value=phases_text[:1024] or "—", inline=False)
+        embed.add_field(name="Запросы БД", value=queries_text[:1024] or "—", inline=False)
+        await interaction.response.send_message(embed=embed, ephemeral=True)
+
+async def setup(bot):
+    await bot.add_cog(Monitoring(bot))
+    logger.info("Мониторинг загружен")
@@ -1,44 +1,54 @@
 import discord
 from discord.ext import commands
 from discord import app_commands
-import uuid
 import logging
-from utils.database import DatabaseManager
-from utils.helpers import (
-    hash_password,
-    validate_username,
-    validate_password,
-    generate_error_code,
-    verify_password
-)
+from utils.database import DatabaseManager, QUEUED, require_database
+from utils.circuit import CircuitOpenError
+from utils.ratelimit import rate_limit
+from utils.interactions import Responder
+from utils.hashing import password_hasher, HashingBusyError
+from utils.skins import skin_validator, skin_path
+from utils.helpers import generate_error_code, generate_access_token
+from utils.validation import validate_username, validate_password
 from config import Config
 
 logger = logging.getLogger("discord_bot")
 
-access_token = str(uuid.uuid4())
-
 class Registration(commands.Cog):
     def __init__(self, bot):
         self.bot = bot
-        self.db = DatabaseManager()
+        self.db: DatabaseManager = bot.db  # общий для всех когов
+        DatabaseManager.add_rejection_handler(self.notify_rejected)
+
+    async def notify_rejected(self, record: dict, reason: str):
+        """Сообщение в ЛС, если отложенную регистрацию или смену пароля БД отклонила."""
+        if record["op"] == "add_user":
+            discord_id = record["args"][2]
+            text = (
+                f"🚨 Регистрация **{record['args'][0]}** не завершена: {reason}. "
+                "Зарегистрируйтесь заново командой /reg."
+            )
+        elif record["op"] == "update_password" and record.get("notify"):
+            discord_id = record["notify"]
+            text = f"🚨 Смена пароля **{record['args'][0]}** не применена: {reason}."
+        else:
+            return
+        user = self.bot.get_user(discord_id) or await self.bot.fetch_user(discord_id)
+        await user.send(text)
 
     async def get_user_data(self, discord_id: int) -> tuple | None:
         """Получение данных пользователя по Discord ID"""
-        with self.db.get_cursor() as cursor:
-            cursor.execute(
-                "SELECT username, password FROM users WHERE discord_id = ?",
-                (discord_id,)
-            )
-            return cursor.fetchone()
+        return await self.db.get_user_by_discord_id(discord_id)
 
     @app_commands.command(
         name="reg",
         description="Регистрация игрового аккаунта"
     )
     @app_commands.describe(
-        login="Логин (3-16 символов, a-Z, 0-9, _)",
-        password="Пароль (минимум 8 символов)"
+        login=f"Логин ({Config.USERNAME_MIN_LENGTH}-{Config.USERNAME_MAX_LENGTH} символов)",
+        password=f"Пароль (минимум {Config.PASSWORD_MIN_LENGTH} символов)"
     )
+    @rate_limit("reg")
     async def register(
         self,
         interaction: discord.Interaction,
@@ -46,50 +56,55 @@ class Registration(commands.Cog):
         password: str
     ):
         """Обработчик команды /reg"""
-        await interaction.response.defer(ephemeral=True)
+        reply = Responder(interaction)
 
         try:
-            # Валидация логина
+            # Проверки без сетевых вызовов: ошибка уходит одним ответом
             if error := validate_username(login):
-                return await interaction.followup.send(f"❌ {error}", ephemeral=True)
+                return await reply.send(f"❌ {error}")
 
-            # Валидация пароля
             if error := validate_password(password):
-                return await interaction.followup.send(f"❌ {error}", ephemeral=True)
-
-            # Проверка существующего пользователя
-            existing = self.db.check_existing_user(interaction.user.id, login)
-            if existing:
-                return await interaction.followup.send(
-                    "❌ Логин уже занят или аккаунт привязан к вам!",
-                    ephemeral=True
-                )
+                return await reply.send(f"❌ {error}")
+
+            # Быстрая проверка по кешу и индексу (без запроса к БД)
+            if self.db.known_conflict(interaction.user.id, login):
+                return await reply.send("❌ Логин уже занят или аккаунт привязан к вам!")
+
+            # defer, только если хеш и запись не успеют до конца окна ответа
+            await reply.prepare(
+                password_hasher.expected_seconds()
+                + Config.REG_BATCH_WINDOW + self.db.expected_seconds()
+            )
 
             # Генерация данных
             user_data = (
                 login,
-                hash_password(password),
+                await password_hasher.hash(password, interaction.user.id),
                 interaction.user.id,
                 "default",
-                access_token
+                generate_access_token()
             )
 
-            # Сохранение в БД
-            self.db.add_user(user_data)
-            
-            await interaction.followup.send(
-                "✅ Регистрация успешна! Используйте логин и пароль в лаунчере.",
-                ephemeral=True
-            )
+            # Сохранение в БД (уникальность проверяется при вставке)
+            await reply.prepare(Config.REG_BATCH_WINDOW + self.db.expected_seconds())
+            result = await self.db.register_user(user_data)
+            if not result:
+                return await reply.send("❌ Логин уже занят или аккаунт привязан к вам!")
+            if result == QUEUED:
+                return await reply.send(
+                    "✅ Регистрация принята! База данных временно недоступна, "
+                    "аккаунт появится в лаунчере в течение нескольких минут."
+                )
+
+            await reply.send("✅ Регистрация успешна! Используйте логин и пароль в лаунчере.")
             logger.info(f"Зарегистрирован новый аккаунт: {login}")
 
+        except HashingBusyError:
+            await reply.send("⏳ Сервер перегружен, повторите попытку позже")
         except Exception as e:
             error_code = generate_error_code()
-            logger.error(f"Ошибка регистрации ({error_code}): {str(e)}", exc_info=True)
-            await interaction.followup.send(
-                f"🚨 Ошибка {error_code}: Не удалось завершить регистрацию",
-                ephemeral=True
-            )
+            logger.error(f"Ошибка регистрации ({error_code}): {str(e)}", exc_info=True, extra={"error_code": error_code})
+            await reply.send(f"🚨 Ошибка {error_code}: Не удалось завершить регистрацию")
 
     @app_commands.command(
         name="changepassword",
@@ -97,8 +112,9 @@ class Registration(commands.Cog):
     )
     @app_commands.describe(
         old_password="Текущий пароль",
-        new_password="Новый пароль (мин. 8 символов)"
+        new_password=f"Новый пароль (мин. {Config.PASSWORD_MIN_LENGTH} символов)"
     )
+    @rate_limit("changepassword")
     async def change_password(
         self,
         interaction: discord.Interaction,
@@ -106,37 +122,98 @@ class Registration(commands.Cog):
         new_password: str
     ):
         """Смена пароля пользователем"""
-        await interaction.response.defer(ephemeral=True)
-        
+        reply = Responder(interaction)
+
         try:
+            # Валидация нового пароля до обращений к БД и bcrypt
+            if error := validate_password(new_password):
+                return await reply.send(f"❌ {error}")
+
+            # Запрос к БД (если нет в кеше), проверка старого и хеш нового пароля
+            await reply.prepare(
+                (0.0 if self.db.user_cached(interaction.user.id) else self.db.expected_seconds())
+                + password_hasher.expected_seconds(2) + self.db.expected_seconds()
+            )
+
             # Получение данных пользователя
             user_data = await self.get_user_data(interaction.user.id)
             if not user_data:
-                return await interaction.followup.send("❌ Аккаунт не найден!", ephemeral=True)
+                return await reply.send("❌ Аккаунт не найден!")
 
-            # Проверка старого пароля
-            current_hash = user_data[1]
-            if not verify_password(old_password, current_hash):
-                return await interaction.followup.send("❌ Неверный текущий пароль!", ephemeral=True)
-
-            # Валидация нового пароля
-            if error := validate_password(new_password):
-                return await interaction.followup.send(f"❌ {error}", ephemeral=True)
+            # Проверка старого пароля (перехеш не нужен: хеш всё равно заменяется новым)
+            if not await password_hasher.verify(old_password, user_data[1], interaction.user.id):
+                return await reply.send("❌ Неверный текущий пароль!")
 
             # Обновление пароля
-            new_hash = hash_password(new_password)
-            self.db.update_password(user_data[0], new_hash)
-            
-            await interaction.followup.send("✅ Пароль успешно изменён!", ephemeral=True)
+            await reply.prepare(password_hasher.expected_seconds() + self.db.expected_seconds())
+            new_hash = await password_hasher.hash(new_password, interaction.user.id)
+            if await self.db.update_password(user_data[0], new_hash, notify=interaction.user.id) == QUEUED:
+                return await reply.send(
+                    "✅ Пароль будет изменён в течение нескольких минут "
+                    "(база данных временно недоступна)"
+                )
+
+            await reply.send("✅ Пароль успешно изменён!")
             logger.info(f"Пользователь {user_data[0]} сменил пароль")
 
+        except HashingBusyError:
+            await reply.send("⏳ Сервер перегружен, повторите попытку позже")
+        except CircuitOpenError:
+            await reply.send("🚨 База данных временно недоступна, повторите попытку позже")
         except Exception as e:
             error_code = generate_error_code()
-            logger.error(f"Ошибка смены пароля ({error_code}): {str(e)}", exc_info=True)
-            await interaction.followup.send(
-                f"🚨 Ошибка {error_code}: Не удалось изменить пароль",
-                ephemeral=True
-            )
+            logger.error(f"Ошибка смены пароля ({error_code}): {str(e)}", exc_info=True, extra={"error_code": error_code})
+            await reply.send(f"🚨 Ошибка {error_code}: Не удалось изменить пароль")
+
+    @app_commands.command(
+        name="skin",
+        description="Загрузить скин (PNG 64x64 или 64x32)"
+    )
+    @app_commands.describe(file="PNG файл скина")
+    @rate_limit("skin")
+    @require_database()
+    async def upload_skin(
+        self,
+        interaction: discord.Interaction,
+        file: discord.Attachment
+    ):
+        """Загрузка скина для лаунчера"""
+        reply = Responder(interaction)
+
+        try:
+            # Размер и имя файла известны без скачивания
+            if error := skin_validator.precheck(file):
+                return await reply.send(error)
+
+            if not self.db.user_cached(interaction.user.id):
+                await reply.prepare(self.db.expected_seconds())
+            user_data = await self.get_user_data(interaction.user.id)
+            if not user_data:
+                return await reply.send("❌ Аккаунт не найден!")
+            try:
+                skin_path(user_data[0])
+            except ValueError as e:
+                logger.warning(f"Скин не принят для логина {user_data[0]!r}: {str(e)}")
+                return await reply.send(f"❌ {e}")
+
+            # Скачивание вложения и разбор PNG: время заранее неизвестно
+            await reply.defer()
+            error, data = await skin_validator.validate(file)
+            if error:
+                return await reply.send(error)
+
+            await skin_validator.store(user_data[0], data)
+            await reply.send("✅ Скин загружен!")
+            logger.info(f"Пользователь {user_data[0]} загрузил скин")
+
+        except Exception as e:
+            error_code = generate_error_code()
+            logger.error(f"Ошибка загрузки скина ({error_code}): {str(e)}", exc_info=True, extra={"error_code": error_code})
+            await reply.send(f"🚨 Ошибка {error_code}: Не удалось загрузить скин")
+
+    async def cog_unload(self):
+        DatabaseManager.remove_rejection_handler(self.notify_rejected)
+        await skin_validator.close()
 
 async def setup(bot):
     await bot.add_cog(Registration(bot))
@@ -1,4 +1,5 @@
 import os
+import re
 from dotenv import load_dotenv
 from typing import Dict, Any
 
@@ -9,31 +10,145 @@ class Config:
     COMMAND_PREFIX: str = os.getenv("COMMAND_PREFIX", "!")
     DEBUG_MODE: bool = os.getenv("DEBUG_MODE", "false").lower() == "true"
 
+    # Хранилище: "mariadb" или встроенная "sqlite"
+    DB_BACKEND: str = os.getenv("DB_BACKEND", "mariadb").lower()
+    SQLITE_PATH: str = os.getenv("SQLITE_PATH", "launcher.sqlite3")
+    SQLITE_CACHED_STATEMENTS: int = int(os.getenv("SQLITE_CACHED_STATEMENTS", 256))
+
+    DB_CONNECT_TIMEOUT: int = int(os.getenv("DB_CONNECT_TIMEOUT", 5))
+    DB_QUERY_TIMEOUT: int = int(os.getenv("DB_QUERY_TIMEOUT", 10))
+
     DB_CONFIG: Dict[str, Any] = {
         "user": os.getenv("DB_USER", "launcher_user"),
         "password": os.getenv("DB_PASSWORD", ""),
         "host": os.getenv("DB_HOST", "localhost"),
         "database": os.getenv("DB_NAME", "launcher"),
         "port": int(os.getenv("DB_PORT", 3306)),
-        "ssl": True
+        "ssl": True,
+        "connect_timeout": DB_CONNECT_TIMEOUT,
+        "read_timeout": DB_QUERY_TIMEOUT,
+        "write_timeout": DB_QUERY_TIMEOUT
     }
 
+    # Пул соединений БД
+    DB_POOL_SIZE: int = int(os.getenv("DB_POOL_SIZE", 10))
+    DB_POOL_MIN_IDLE: int = int(os.getenv("DB_POOL_MIN_IDLE", 2))
+    DB_POOL_MAX_LIFETIME: float = float(os.getenv("DB_POOL_MAX_LIFETIME", 1800))
+    DB_POOL_TIMEOUT: float = float(os.getenv("DB_POOL_TIMEOUT", 5))
+    DB_POOL_PING_INTERVAL: float = float(os.getenv("DB_POOL_PING_INTERVAL", 30))
+
+    # Фоновая проверка БД и автомат размыкания
+    DB_HEALTH_INTERVAL: float = float(os.getenv("DB_HEALTH_INTERVAL", 10))
+    DB_BREAKER_THRESHOLD: int = int(os.getenv("DB_BREAKER_THRESHOLD", 3))
+    DB_BREAKER_RESET: float = float(os.getenv("DB_BREAKER_RESET", 15))
+
+    # Журнал записей на время недоступности БД
+    JOURNAL_PATH: str = os.getenv("JOURNAL_PATH", "journal.jsonl")
+    JOURNAL_MAX_BATCH: int = int(os.getenv("JOURNAL_MAX_BATCH", 100))
+    JOURNAL_FLUSH_WINDOW: float = float(os.getenv("JOURNAL_FLUSH_WINDOW", 0.005))
+
+    # Период сверки индекса логинов с БД (секунды)
+    LOGIN_INDEX_REFRESH: int = int(os.getenv("LOGIN_INDEX_REFRESH", 300))
+
+    # Кеш пользователей
+    USER_CACHE_SIZE: int = int(os.getenv("USER_CACHE_SIZE", 10000))
+    USER_CACHE_TTL: float = float(os.getenv("USER_CACHE_TTL", 300))
+    USER_CACHE_NEGATIVE_TTL: float = float(os.getenv("USER_CACHE_NEGATIVE_TTL", 30))
+
+    # Политика логинов и паролей
+    USERNAME_MIN_LENGTH: int = int(os.getenv("USERNAME_MIN_LENGTH", 3))
+    USERNAME_MAX_LENGTH: int = int(os.getenv("USERNAME_MAX_LENGTH", 16))
+    USERNAME_PATTERN: str = os.getenv("USERNAME_PATTERN", r"[A-Za-z0-9_]+")
+    PASSWORD_MIN_LENGTH: int = int(os.getenv("PASSWORD_MIN_LENGTH", 8))
+    PASSWORD_REQUIRE: str = os.getenv("PASSWORD_REQUIRE", "upper,digit")  # upper, lower, digit, special
+    BLOCKED_NAMES: str = os.getenv(
+        "BLOCKED_NAMES", "admin,administrator,moderator,root,system,console,server,owner"
+    )
+    BLOCKED_NAMES_FILE: str = os.getenv("BLOCKED_NAMES_FILE", "")
+    BREACHED_PASSWORDS_FILE: str = os.getenv("BREACHED_PASSWORDS_FILE", "")  # фильтр Блума
+
+    # Пакетная запись регистраций
+    REG_BATCH_SIZE: int = int(os.getenv("REG_BATCH_SIZE", 50))
+    REG_BATCH_WINDOW: float = float(os.getenv("REG_BATCH_WINDOW", 0.05))
+
+    # Массовые операции администратора
+    BULK_CHUNK_SIZE: int = int(os.getenv("BULK_CHUNK_SIZE", 500))
+    BULK_MAX_FILE_SIZE: int = int(os.getenv("BULK_MAX_FILE_SIZE", 1024 * 1024))
+    # Больше стольких аккаунтов /bulkdelete и /bulkpassword меняют только с confirm:<число>
+    BULK_CONFIRM_THRESHOLD: int = int(os.getenv("BULK_CONFIRM_THRESHOLD", 20))
+
+    # Скины
+    SKINS_DIR: str = os.getenv("SKINS_DIR", "skins")
+    SKIN_MAX_SIZE: int = int(os.getenv("SKIN_MAX_SIZE", 256 * 1024))
+    SKIN_CACHE_SIZE: int = int(os.getenv("SKIN_CACHE_SIZE", 1024))
+    SKIN_WORKERS: int = int(os.getenv("SKIN_WORKERS", 2))
+
+    # Хеширование паролей
+    BCRYPT_ROUNDS: int = int(os.getenv("BCRYPT_ROUNDS", 12))
+    HASH_WORKERS: int = int(os.getenv("HASH_WORKERS", os.cpu_count() or 1))
+    HASH_QUEUE_SIZE: int = int(os.getenv("HASH_QUEUE_SIZE", 32))
+    HASH_PER_USER: int = int(os.getenv("HASH_PER_USER", 1))
+
+    # Лимиты частоты команд ("<запросов>/<секунд>")
+    RATE_LIMIT_USER: str = os.getenv("RATE_LIMIT_USER", "5/60")
+    RATE_LIMITS: Dict[str, str] = {
+        "reg": os.getenv("RATE_LIMIT_REG", "2/60"),
+        "changepassword": os.getenv("RATE_LIMIT_CHANGEPASSWORD", "3/60"),
+        "skin": os.getenv("RATE_LIMIT_SKIN", "3/60"),
+        "setpassword": os.getenv("RATE_LIMIT_SETPASSWORD", "20/60"),
+        "bulkpassword": os.getenv("RATE_LIMIT_BULKPASSWORD", "2/300"),
+    }
+    RATE_LIMIT_GUILD: str = os.getenv("RATE_LIMIT_GUILD", "60/60")
+    RATE_LIMIT_GLOBAL: str = os.getenv("RATE_LIMIT_GLOBAL", "120/60")
+
+    # Ответы на команды: запас до окна Discord в 3 с, при нехватке которого делается defer
+    RESPONSE_DEFER_MARGIN: float = float(os.getenv("RESPONSE_DEFER_MARGIN", 1.0))
+
+    # Метрики (эндпоинт Prometheus)
+    METRICS_ENABLED: bool = os.getenv("METRICS_ENABLED", "false").lower() == "true"
+    METRICS_HOST: str = os.getenv("METRICS_HOST", "127.0.0.1")
+    METRICS_PORT: int = int(os.getenv("METRICS_PORT", 9100))
+
+    # Запуск бота
+    AUTO_SHARD: bool = os.getenv("AUTO_SHARD", "false").lower() == "true"
+    SHARD_COUNT: int | None = int(os.getenv("SHARD_COUNT")) if os.getenv("SHARD_COUNT") else None
+    # Без привилегированных интентов, кеша участников и сообщений
+    LOW_MEMORY_MODE: bool = os.getenv("LOW_MEMORY_MODE", "true").lower() == "true"
+    COMMAND_HASH_FILE: str = os.getenv("COMMAND_HASH_FILE", ".commands_hash")
+
     ADMIN_ROLE_ID: int = int(os.getenv("ADMIN_ROLE_ID", 0))
     
     LOG_LEVEL: str = os.getenv("LOG_LEVEL", "INFO")
     LOG_FILE: str = os.getenv("LOG_FILE", "bot.log")
+    LOG_JSON: bool = os.getenv("LOG_JSON", "true").lower() == "true"
+    LOG_MAX_BYTES: int = int(os.getenv("LOG_MAX_BYTES", 10 * 1024 * 1024))
+    LOG_BACKUP_COUNT: int = int(os.getenv("LOG_BACKUP_COUNT", 5))
+    LOG_ROTATE_WHEN: str = os.getenv("LOG_ROTATE_WHEN", "")  # например "midnight"
 
     @classmethod
     def validate(cls):
         errors = []
         if not cls.BOT_TOKEN:
             errors.append("Не задан BOT_TOKEN в .env")
-        if not cls.DB_CONFIG["password"]:
+        if cls.DB_BACKEND not in ("mariadb", "sqlite"):
+            errors.append(f"Неизвестный DB_BACKEND: {cls.DB_BACKEND}")
+        if cls.DB_BACKEND == "mariadb" and not cls.DB_CONFIG["password"]:
             errors.append("Не задан пароль БД (DB_PASSWORD)")
         if cls.ADMIN_ROLE_ID == 0:
             errors.append("ADMIN_ROLE_ID не настроен")
 
-        if errors:
-            raise EnvironmentError("\n".join(errors))
+        # Политика проверки (utils.validation); длины ограничены столбцом и bcrypt
+        if not 1 <= cls.USERNAME_MIN_LENGTH <= cls.USERNAME_MAX_LENGTH <= 32:
+            errors.append("Нужно 1 ≤ USERNAME_MIN_LENGTH ≤ USERNAME_MAX_LENGTH ≤ 32")
+        if not 1 <= cls.PASSWORD_MIN_LENGTH <= 72:
+            errors.append("PASSWORD_MIN_LENGTH должен быть от 1 до 72")
+        try:
+            re.compile(cls.USERNAME_PATTERN)
+        except re.error as e:
+            errors.append(f"Некорректный USERNAME_PATTERN: {e}")
+        unknown = set(filter(None, cls.PASSWORD_REQUIRE.split(","))) - {"upper", "lower", "digit", "special"}
+        if unknown:
+            errors.append(f"Неизвестные классы в PASSWORD_REQUIRE: {', '.join(sorted(unknown))}")
 
-Config.validate()
\ No newline at end of file
+        if errors:
+            raise EnvironmentError("\n".join(errors))
\ No newline at end of file
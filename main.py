@@ -1,43 +1,137 @@
+import time
+STARTED = time.perf_counter()  # до тяжёлых импортов: учитываются в замере старта
+
+import os
+import json
+import asyncio
+import hashlib
 import discord
 import logging
 from discord import Intents
-from discord.ext.commands import Bot
+from discord.ext.commands import Bot, AutoShardedBot
 from config import Config
-from cogs.registration import Registration
-from cogs.admin import AdminTools
-
-
-# Настройка логгера
-logging.basicConfig(
-    level=logging.INFO,
-    format="%(asctime)s [%(levelname)s] %(message)s",
-    handlers=[
-        logging.FileHandler("bot.log", encoding="utf-8", mode="a"),
-        logging.StreamHandler()
-    ]
-)
+from utils.metrics import MetricsCommandTree
+from utils.logging_setup import setup_logging
+from utils.helpers import get_rss_bytes
+from utils.database import DatabaseManager
+from utils.hashing import password_hasher
+
+IMPORT_SECONDS = time.perf_counter() - STARTED
+
+
+# Настройка логгера (запись в файл в фоновом потоке)
+setup_logging()
 logger = logging.getLogger("discord_bot")
 
+EXTENSIONS = ("cogs.registration", "cogs.admin", "cogs.monitoring")
+
+# При AUTO_SHARD discord.py сам определяет число шардов
+BotBase = AutoShardedBot if Config.AUTO_SHARD else Bot
+
+
+class LauncherBot(BotBase):
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.db: DatabaseManager | None = None  # общий для всех когов, создаётся при старте
+        self.db_ready = asyncio.Event()  # пул прогрет, миграции применены
+        self.startup_timings: dict[str, float] = {"импорт": IMPORT_SECONDS}
+
+    async def _timed(self, phase: str, coro):
+        start = time.perf_counter()
+        try:
+            return await coro
+        finally:
+            self.startup_timings[phase] = time.perf_counter() - start
+
+    async def setup_hook(self):
+        """Однократная инициализация при старте: прогрев и загрузка модулей параллельно"""
+        self.db = DatabaseManager()
+        await asyncio.gather(
+            self._timed("БД", self.prepare_database()),
+            self._timed("bcrypt", password_hasher.warmup()),
+            self._timed("модули", self.load_extensions()),
+        )
+        await self._timed("синхронизация", self.sync_commands())
+        logger.info(
+            "Этапы старта: "
+            + ", ".join(f"{phase} {seconds:.2f} с" for phase, seconds in self.startup_timings.items())
+        )
+
+    async def prepare_database(self):
+        """Прогрев пула и миграции (ошибки не останавливают запуск)"""
+        try:
+            await self.db.warmup()
+            applied = await self.db.migrate()
+            if applied:
+                logger.info(f"Применены миграции: {applied}")
+        except Exception as e:
+            logger.error(f"Не удалось подготовить БД: {str(e)}")
+        finally:
+            self.db_ready.set()
+
+    async def load_extensions(self):
+        for extension in EXTENSIONS:
+            await self._timed(extension, self.load_extension(extension))
+        logger.info("Все модули загружены")
+
+    def commands_hash(self) -> str:
+        """Хеш определений слеш-команд и приложения (смена токена требует синхронизации)"""
+        payload = {
+            "application_id": self.application_id,
+            "commands": [command.to_dict(self.tree) for command in self.tree.get_commands()],
+        }
+        return hashlib.sha256(json.dumps(payload, sort_keys=True).encode()).hexdigest()
+
+    async def sync_commands(self):
+        """Синхронизация слеш-команд, только если их определения изменились"""
+        digest = self.commands_hash()
+        if os.path.exists(Config.COMMAND_HASH_FILE):
+            with open(Config.COMMAND_HASH_FILE, encoding="utf-8") as f:
+                if f.read().strip() == digest:
+                    logger.info("Слеш-команды не изменились, синхронизация пропущена")
+                    return
+
+        await self.tree.sync()
+        with open(Config.COMMAND_HASH_FILE, "w", encoding="utf-8") as f:
+            f.write(digest)
+        logger.info("Слеш-команды синхронизированы")
+
+
 # Инициализация бота
-intents = Intents.default()
-intents.message_content = True
-intents.members = True
+if Config.LOW_MEMORY_MODE:
+    # Все команды слеш-команды: достаточно событий серверов, остальные не принимаются
+    intents = Intents.none()
+    intents.guilds = True
+    member_cache_flags = discord.MemberCacheFlags.none()
+else:
+    intents = Intents.default()
+    intents.message_content = True
+    intents.members = True
+    member_cache_flags = discord.MemberCacheFlags.from_intents(intents)
 
-bot = Bot(command_prefix="!", intents=intents)
+bot = LauncherBot(
+    command_prefix=Config.COMMAND_PREFIX,
+    intents=intents,
+    member_cache_flags=member_cache_flags,
+    chunk_guilds_at_startup=not Config.LOW_MEMORY_MODE,
+    max_messages=None if Config.LOW_MEMORY_MODE else 1000,
+    tree_cls=MetricsCommandTree,
+    shard_count=Config.SHARD_COUNT
+)
 
 @bot.event
 async def on_ready():
-    """Обработчик события запуска бота"""
-    logger.info(f"Запуск бота {bot.user} | ID: {bot.user.id}")
-    await load_cogs()
-    await bot.tree.sync()
-    logger.info("Слеш-команды синхронизированы")
-
-async def load_cogs():
-    """Загрузка модулей"""
-    await bot.add_cog(Registration(bot))
-    await bot.add_cog(AdminTools(bot))
-    logger.info("Все модули загружены")
+    """Обработчик события запуска бота (повторяется при переподключении)"""
+    logger.info(f"Запуск бота {bot.user} | ID: {bot.user.id} | шардов: {bot.shard_count or 1}")
+    if "готовность" not in bot.startup_timings:
+        bot.startup_timings["готовность"] = time.perf_counter() - STARTED
+        logger.info(f"Бот готов через {bot.startup_timings['готовность']:.2f} с после запуска")
+    members = sum(len(guild.members) for guild in bot.guilds)
+    logger.info(
+        f"Память: RSS {get_rss_bytes() / 1024 / 1024:.1f} МБ | серверов: {len(bot.guilds)} | "
+        f"участников в кеше: {members} | экономный режим: {Config.LOW_MEMORY_MODE}"
+    )
 
 if __name__ == "__main__":
-    bot.run(Config.BOT_TOKEN)
+    Config.validate()
+    bot.run(Config.BOT_TOKEN, log_handler=None)
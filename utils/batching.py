@@ -0,0 +1,58 @@
+import asyncio
+from typing import Any, Awaitable, Callable
+
+
+class BatchWriter:
+    """Объединение параллельных операций записи в пакеты.
+
+    Элементы копятся до ``max_batch`` штук или ``window`` секунд, затем
+    отправляются одним вызовом ``handler``, который возвращает результат
+    для каждого элемента в том же порядке.
+    """
+
+    def __init__(
+        self,
+        handler: Callable[[list], Awaitable[list]],
+        max_batch: int = 50,
+        window: float = 0.05
+    ):
+        self.handler = handler
+        self.max_batch = max(1, max_batch)
+        self.window = window
+        self._items: list[tuple[Any, asyncio.Future]] = []
+        self._timer: asyncio.TimerHandle | None = None
+        self._tasks: set[asyncio.Task] = set()
+
+    async def submit(self, item: Any) -> Any:
+        """Постановка элемента в пакет и ожидание его результата."""
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        self._items.append((item, future))
+        if len(self._items) >= self.max_batch:
+            self._flush()
+        elif self._timer is None:
+            self._timer = loop.call_later(self.window, self._flush)
+        return await future
+
+    def _flush(self) -> None:
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+        if not self._items:
+            return
+        batch, self._items = self._items, []
+        task = asyncio.get_running_loop().create_task(self._process(batch))
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+
+    async def _process(self, batch: list[tuple[Any, asyncio.Future]]) -> None:
+        try:
+            results = await self.handler([item for item, _ in batch])
+        except Exception as e:
+            for _, future in batch:
+                if not future.done():
+                    future.set_exception(e)
+            return
+        for (_, future), result in zip(batch, results):
+            if not future.done():
+                future.set_result(result)
@@ -0,0 +1,98 @@
+from typing import Any, Dict, Hashable
+from cachetools import TTLCache
+
+
+class UserCache:
+    """Кеш поиска пользователей по ``discord_id`` и ``username``.
+
+    Найденные записи живут ``ttl`` секунд, отсутствие записи —
+    ``negative_ttl`` секунд. Логины приводятся к нижнему регистру,
+    как при сравнении в MariaDB.
+
+    Чтение берёт ``generation()`` до запроса и передаёт его в ``set``:
+    если за время запроса запись сбросили, устаревший результат не сохраняется.
+    """
+
+    def __init__(self, maxsize: int = 10000, ttl: float = 300, negative_ttl: float = 30):
+        self._found = TTLCache(maxsize=maxsize, ttl=ttl)
+        self._missing = TTLCache(maxsize=maxsize, ttl=negative_ttl)
+        self._owners = TTLCache(maxsize=maxsize, ttl=ttl)  # username -> discord_id
+        # Поколение последнего сброса ключа; запросы короче ttl, поэтому хватает TTL
+        self._invalidated = TTLCache(maxsize=maxsize, ttl=ttl)
+        self._generation = 0
+        self.hits = 0
+        self.misses = 0
+
+    @staticmethod
+    def _key(kind: str, key: Hashable) -> tuple:
+        return kind, key.lower() if isinstance(key, str) else key
+
+    def get(self, kind: str, key: Hashable) -> tuple[bool, Any]:
+        """Поиск в кеше: (найдено ли в кеше, значение или None)."""
+        cache_key = self._key(kind, key)
+        value = self._found.get(cache_key)
+        if value is not None:
+            self.hits += 1
+            return True, value
+        if cache_key in self._missing:
+            self.hits += 1
+            return True, None
+        self.misses += 1
+        return False, None
+
+    def __contains__(self, item: tuple[str, Hashable]) -> bool:
+        """Есть ли ответ в кеше (без учёта в статистике): ``(kind, key) in cache``."""
+        cache_key = self._key(*item)
+        return cache_key in self._found or cache_key in self._missing
+
+    def generation(self) -> int:
+        """Текущее поколение сбросов; берётся перед запросом к БД."""
+        return self._generation
+
+    def set(self, kind: str, key: Hashable, value: Any, generation: int | None = None) -> None:
+        """Сохранение результата запроса (None — запись не найдена).
+
+        С ``generation`` результат отбрасывается, если ключ сбросили после его начала.
+        """
+        cache_key = self._key(kind, key)
+        if generation is not None and self._invalidated.get(cache_key, -1) > generation:
+            return
+        if value is None:
+            self._found.pop(cache_key, None)
+            self._missing[cache_key] = True
+        else:
+            self._missing.pop(cache_key, None)
+            self._found[cache_key] = value
+
+    def link(self, username: str, discord_id: int) -> None:
+        """Запоминание владельца логина для инвалидации по логину."""
+        self._owners[username.lower()] = discord_id
+
+    def invalidate(self, username: str | None = None, discord_id: int | None = None) -> None:
+        """Сброс всех записей пользователя."""
+        keys = []
+        if username is not None:
+            username = username.lower()
+            keys += [("info", username), ("password", username)]
+            owner = self._owners.pop(username, None)
+            if discord_id is None:
+                discord_id = owner
+        if discord_id is not None:
+            keys.append(("discord", discord_id))
+        self._generation += 1
+        for key in keys:
+            self._found.pop(key, None)
+            self._missing.pop(key, None)
+            self._invalidated[key] = self._generation
+
+    def stats(self) -> Dict[str, Any]:
+        """Статистика попаданий."""
+        total = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / total if total else 0.0,
+            "size": len(self._found),
+            "negative_size": len(self._missing),
+            "maxsize": self._found.maxsize,
+        }
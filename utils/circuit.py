@@ -0,0 +1,85 @@
+import time
+import logging
+from discord import app_commands
+
+logger = logging.getLogger("discord_bot")
+
+
+class CircuitOpenError(app_commands.CheckFailure):
+    """Вызов отклонён без попытки: зависимость недоступна."""
+
+    def __init__(self, name: str, retry_after: float):
+        self.name = name
+        self.retry_after = retry_after
+        super().__init__(f"{name} недоступна, повтор через {retry_after:.0f} с")
+
+
+class CircuitBreaker:
+    """Автомат «закрыт → разомкнут → полуоткрыт».
+
+    После ``failure_threshold`` сбоев подряд вызовы отклоняются сразу.
+    Через ``reset_timeout`` секунд пропускается один пробный вызов:
+    успех замыкает цепь, сбой снова размыкает её.
+    Используется из цикла событий, блокировки не нужны.
+    """
+
+    CLOSED = "closed"
+    OPEN = "open"
+    HALF_OPEN = "half_open"
+
+    def __init__(self, name: str, failure_threshold: int = 3, reset_timeout: float = 15):
+        self.name = name
+        self.failure_threshold = max(1, failure_threshold)
+        self.reset_timeout = reset_timeout
+        self._state = self.CLOSED
+        self._failures = 0
+        self._opened_at = 0.0
+        self._trial = False  # пробный вызов в полуоткрытом состоянии уже идёт
+
+    @property
+    def state(self) -> str:
+        if self._state == self.OPEN and time.monotonic() - self._opened_at >= self.reset_timeout:
+            self._state = self.HALF_OPEN
+        return self._state
+
+    @property
+    def retry_after(self) -> float:
+        if self.state != self.OPEN:
+            return 0.0
+        return max(0.0, self._opened_at + self.reset_timeout - time.monotonic())
+
+    def allow(self) -> bool:
+        """Можно ли выполнить вызов (в полуоткрытом состоянии — только один)."""
+        state = self.state
+        if state == self.CLOSED:
+            return True
+        if state == self.HALF_OPEN and not self._trial:
+            self._trial = True
+            return True
+        return False
+
+    def check(self) -> None:
+        """``allow()`` с исключением при отказе."""
+        if not self.allow():
+            raise CircuitOpenError(self.name, self.retry_after or self.reset_timeout)
+
+    def record_success(self) -> None:
+        if self._state != self.CLOSED:
+            logger.info(f"{self.name}: связь восстановлена")
+        self._state = self.CLOSED
+        self._failures = 0
+        self._trial = False
+
+    def record_failure(self) -> None:
+        self._failures += 1
+        self._trial = False
+        if self._state == self.OPEN:
+            return  # сбои вызовов, начатых до размыкания
+        if self._state == self.HALF_OPEN or self._failures >= self.failure_threshold:
+            logger.error(f"{self.name}: недоступна, вызовы отклоняются {self.reset_timeout:.0f} с")
+            self._state = self.OPEN
+            self._opened_at = time.monotonic()
+
+    def release(self) -> None:
+        """Снятие пробного вызова без результата (например, при отмене)."""
+        self._trial = False
@@ -1,104 +1,802 @@
-import mariadb
+import asyncio
+import csv
+import time
 import logging
+from concurrent.futures import ThreadPoolExecutor
 from contextlib import contextmanager
+from typing import Dict, Any, AsyncIterator, Awaitable, Callable
 from config import Config
+from utils.storage import StorageBackend, create_backend
+from utils import migrations
+from utils.login_index import LoginIndex
+from utils.cache import UserCache
+from utils.batching import BatchWriter
+from utils.journal import WriteJournal
+from utils.metrics import metrics, LatencyEstimate
+from utils.circuit import CircuitBreaker, CircuitOpenError
+from discord import app_commands
 
 logger = logging.getLogger("discord_bot")
 
+
+class DatabaseTimeoutError(Exception):
+    """Запрос к БД не уложился в отведённое время."""
+
+
+class InsertRejectedError(Exception):
+    """Строка не вставлена без конфликта уникальности (ошибку скрыл INSERT IGNORE)."""
+
+
+# Результат записи, принятой в журнал до восстановления БД
+QUEUED = "queued"
+
+
+# Запросы к таблице users; {placeholders} заполняется по числу значений
+SQL: Dict[str, str] = {
+    "add_user": """INSERT INTO users
+        (username, password, discord_id, serverID, accessToken)
+        VALUES (?, ?, ?, ?, ?)""",
+    "add_users": """INSERT IGNORE INTO users
+        (username, password, discord_id, serverID, accessToken)
+        VALUES (?, ?, ?, ?, ?)""",
+    "tokens_by_logins": "SELECT accessToken FROM users WHERE username IN ({placeholders})",
+    "delete_user": "DELETE FROM users WHERE username = ?",
+    "update_password": "UPDATE users SET password = ? WHERE username = ?",
+    "filter_existing_logins": "SELECT username FROM users WHERE username IN ({placeholders})",
+    # Постранично по ключу: следующая страница начинается после последнего логина
+    "find_logins": """SELECT username FROM users WHERE username LIKE ? ESCAPE '\\\\'
+        AND username > ? ORDER BY username LIMIT ?""",
+    "count_logins": "SELECT COUNT(*) FROM users WHERE username LIKE ? ESCAPE '\\\\'",
+    # Два поиска по уникальным индексам вместо OR по разным столбцам
+    "check_existing_user": """SELECT 1 FROM users WHERE discord_id = ?
+        UNION ALL
+        SELECT 1 FROM users WHERE username = ?
+        LIMIT 1""",
+    "search_logins": "SELECT username FROM users WHERE username LIKE ? ESCAPE '\\\\' LIMIT 10",
+    "fetch_all_logins": "SELECT username FROM users",
+    "get_user_password": "SELECT password FROM users WHERE username = ?",
+    "get_user_info": "SELECT uuid, discord_id, serverID FROM users WHERE username = ?",
+    "get_user_by_discord_id": "SELECT username, password FROM users WHERE discord_id = ?",
+}
+
+def escape_like(value: str) -> str:
+    """Экранирование %, _ и \\ для LIKE ... ESCAPE '\\'."""
+    return value.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+
+
+# Параметры для EXPLAIN и признак того, что полный проход ожидаем
+EXPLAIN_CASES: Dict[str, tuple[tuple, bool]] = {
+    "tokens_by_logins": (("explain_probe",), False),
+    "delete_user": (("explain_probe",), False),
+    "update_password": (("", "explain_probe"), False),
+    "filter_existing_logins": (("explain_probe",), False),
+    "find_logins": (("explain%", "", 500), False),
+    "count_logins": (("explain%",), False),
+    "check_existing_user": ((0, "explain_probe"), False),
+    "search_logins": (("%explain%",), True),
+    "fetch_all_logins": ((), True),
+    "get_user_password": (("explain_probe",), False),
+    "get_user_info": (("explain_probe",), False),
+    "get_user_by_discord_id": ((0,), False),
+}
+
+
 class DatabaseManager:
+    _storage: StorageBackend | None = None  # Общее хранилище для всех экземпляров
+    _executor: ThreadPoolExecutor | None = None  # Общие потоки для запросов
+    _login_index: LoginIndex | None = None  # Общий индекс логинов
+    _cache: UserCache | None = None  # Общий кеш пользователей
+    _registrations: BatchWriter | None = None  # Общая очередь регистраций
+    _breaker: CircuitBreaker | None = None  # Общее состояние доступности БД
+    _journal: WriteJournal | None = None  # Общий журнал отложенных записей
+    _latency = LatencyEstimate(initial=0.05)  # Время успешного запроса
+    _schema_verified: bool | None = None  # Уникальные индексы на месте (None — ещё не проверено)
+    _replay_lock = asyncio.Lock()
+    _migrate_lock = asyncio.Lock()  # Миграции при старте и из фоновой проверки не идут параллельно
+    # Обработчики записей журнала, которые БД отклонила при применении
+    _rejection_handlers: list[Callable[[dict, str], Awaitable[None]]] = []
+
     def __init__(self):
         self.config = Config.DB_CONFIG  # Конфигурация из config.py
+        if DatabaseManager._storage is None:
+            # Соединения открываются в warmup() или по первому запросу
+            DatabaseManager._storage = create_backend()
+        if DatabaseManager._executor is None:
+            # Потоков не больше, чем соединений: лишние ждали бы пул
+            DatabaseManager._executor = ThreadPoolExecutor(
+                max_workers=Config.DB_POOL_SIZE,
+                thread_name_prefix="db"
+            )
+        if DatabaseManager._login_index is None:
+            DatabaseManager._login_index = LoginIndex()
+        self.storage = DatabaseManager._storage
+        self.executor = DatabaseManager._executor
+        if DatabaseManager._cache is None:
+            DatabaseManager._cache = UserCache(
+                maxsize=Config.USER_CACHE_SIZE,
+                ttl=Config.USER_CACHE_TTL,
+                negative_ttl=Config.USER_CACHE_NEGATIVE_TTL
+            )
+        if DatabaseManager._registrations is None:
+            DatabaseManager._registrations = BatchWriter(
+                self._register_batch,
+                max_batch=Config.REG_BATCH_SIZE,
+                window=Config.REG_BATCH_WINDOW
+            )
+        if DatabaseManager._breaker is None:
+            DatabaseManager._breaker = CircuitBreaker(
+                "БД",
+                failure_threshold=Config.DB_BREAKER_THRESHOLD,
+                reset_timeout=Config.DB_BREAKER_RESET
+            )
+        if DatabaseManager._journal is None:
+            DatabaseManager._journal = WriteJournal(
+                Config.JOURNAL_PATH,
+                max_batch=Config.JOURNAL_MAX_BATCH,
+                window=Config.JOURNAL_FLUSH_WINDOW
+            )
+        self.login_index = DatabaseManager._login_index
+        self.cache = DatabaseManager._cache
+        self.registrations = DatabaseManager._registrations
+        self.breaker = DatabaseManager._breaker
+        self.journal = DatabaseManager._journal
+        self.latency = DatabaseManager._latency
+        # Ошибки, при которых запись уходит в журнал
+        self.offline_errors = (
+            CircuitOpenError, DatabaseTimeoutError, *self.storage.connection_errors
+        )
 
     @contextmanager
-    def get_cursor(self):
-        """Контекстный менеджер для работы с курсором БД."""
-        conn = None
-        try:
-            conn = mariadb.connect(**self.config)
-            cursor = conn.cursor()
-            yield cursor
-            conn.commit()
-        except mariadb.Error as e:
-            logger.error(f"Ошибка БД: {str(e)}")
-            if conn:
+    def get_cursor(self, **options):
+        """Контекстный менеджер для работы с курсором БД (блокирующий)."""
+        with self.storage.connection() as conn:
+            cursor = conn.cursor(**options)
+            try:
+                yield cursor
+                conn.commit()
+            except Exception as e:
+                if isinstance(e, self.storage.errors):
+                    logger.error(f"Ошибка БД: {str(e)}")
                 conn.rollback()
+                raise
+            finally:
+                cursor.close()
+
+    async def run(
+        self,
+        func: Callable,
+        *args,
+        timeout: float | None = Config.DB_QUERY_TIMEOUT,
+        breaker: bool = True
+    ):
+        """Выполнение блокирующей функции в потоке БД с таймаутом (None — без него).
+
+        Отмена ожидающей задачи снимает ещё не начатый запрос с очереди;
+        уже выполняющийся запрос ограничен ``read_timeout`` соединения.
+        При разомкнутой цепи (``breaker``) вызов сразу завершается
+        ``CircuitOpenError``, не дожидаясь таймаутов подключения.
+        """
+        if breaker:
+            self.breaker.check()
+        loop = asyncio.get_running_loop()
+        future = loop.run_in_executor(self.executor, func, *args)
+        name = getattr(func, "__name__", str(func))
+        start = time.perf_counter()
+        try:
+            result = await asyncio.wait_for(future, timeout)
+        except asyncio.TimeoutError:
+            if breaker:
+                self.breaker.record_failure()
+            raise DatabaseTimeoutError(f"{name} не выполнен за {timeout} с") from None
+        except self.storage.connection_errors:
+            if breaker:
+                self.breaker.record_failure()
             raise
+        except Exception:
+            if breaker:
+                self.breaker.record_success()  # БД ответила, ошибка в самом запросе
+            raise
+        except BaseException:
+            if breaker:
+                self.breaker.release()
+            raise
+        else:
+            if breaker:
+                self.breaker.record_success()
+            if timeout == Config.DB_QUERY_TIMEOUT:
+                # Только обычные запросы: выгрузки и миграции не искажают оценку
+                self.latency.observe(time.perf_counter() - start)
+            return result
         finally:
-            if conn:
-                conn.close()
+            if metrics.enabled:
+                elapsed = time.perf_counter() - start
+                metrics.db_query_seconds.observe(elapsed, query=name.lstrip("_"))
+                metrics.observe_phase("db", elapsed)
+
+    def pool_stats(self) -> Dict[str, Any]:
+        """Статистика пула соединений."""
+        return self.storage.stats()
+
+    def cache_stats(self) -> Dict[str, Any]:
+        """Статистика кеша пользователей."""
+        return self.cache.stats()
+
+    async def _cached(self, kind: str, key, func: Callable, *args):
+        """Чтение через кеш: при промахе результат запроса сохраняется."""
+        found, value = self.cache.get(kind, key)
+        if found:
+            return value
+        generation = self.cache.generation()
+        value = await self.run(func, *args)
+        self.cache.set(kind, key, value, generation)
+        return value
+
+    # Асинхронный API для когов
+
+    def _offline(self) -> bool:
+        """Писать ли в журнал: БД недоступна или журнал ещё не применён
+        (новые записи не должны обгонять отложенные)."""
+        return len(self.journal) > 0 or not self.available
+
+    async def add_user(self, user_data: tuple) -> str | None:
+        """Добавление пользователя в БД (QUEUED — отложено в журнал)."""
+        if not self._offline():
+            try:
+                await self.run(self._add_user, user_data)
+            except self.offline_errors:
+                pass
+            else:
+                self.cache.invalidate(user_data[0], user_data[2])
+                self.login_index.add(user_data[0])
+                return None
+        return await self._queue_user(user_data)
+
+    async def register_user(self, user_data: tuple) -> bool | str:
+        """Регистрация через пакетную вставку.
+
+        Уникальность логина и Discord ID обеспечивают ограничения БД;
+        пока их наличие не подтверждено ``verify()``, перед вставкой
+        идёт явная проверка. False — логин занят или аккаунт уже
+        привязан, QUEUED — БД недоступна и регистрация записана в журнал.
+        """
+        if not self._offline():
+            try:
+                if not DatabaseManager._schema_verified and await self.check_existing_user(
+                    user_data[2], user_data[0]
+                ):
+                    return False
+                inserted = await self.registrations.submit(user_data)
+            except self.offline_errors:
+                pass
+            else:
+                if inserted is None:
+                    raise InsertRejectedError(f"Регистрация {user_data[0]} не вставлена")
+                if inserted:
+                    self.cache.invalidate(user_data[0], user_data[2])
+                    self.login_index.add(user_data[0])
+                return inserted
+        return await self._queue_user(user_data)
+
+    async def _queue_user(self, user_data: tuple) -> str:
+        # Ключ идемпотентности — accessToken: при повторе вставка узнаётся по нему
+        await self.journal.append("add_user", user_data, key=user_data[4])
+        self.login_index.add(user_data[0])
+        self.cache.set("discord", user_data[2], (user_data[0], user_data[1]))
+        self.cache.link(user_data[0], user_data[2])
+        logger.warning(f"Регистрация {user_data[0]} отложена до восстановления БД")
+        return QUEUED
+
+    def known_conflict(self, discord_id: int, username: str) -> bool:
+        """Быстрая проверка занятости по кешу и индексу, без запроса к БД."""
+        if username in self.login_index:
+            return True
+        _, user = self.cache.get("discord", discord_id)
+        return user is not None
+
+    async def _register_batch(self, rows: list[tuple]) -> list[bool]:
+        return await self.run(self._add_users, rows)
+
+    async def delete_user(self, username: str) -> int | str:
+        """Удаление пользователя из БД (QUEUED — отложено в журнал)."""
+        if not self._offline():
+            try:
+                deleted = await self.run(self._delete_user, username)
+            except self.offline_errors:
+                pass
+            else:
+                self.cache.invalidate(username)
+                if deleted:
+                    self.login_index.remove(username)
+                return deleted
+        await self._queue_delete([username])
+        return QUEUED
+
+    async def delete_users(self, usernames: list[str]) -> int | str:
+        """Массовое удаление пользователей одним executemany (QUEUED — в журнал)."""
+        if not self._offline():
+            try:
+                deleted = await self.run(self._delete_users, usernames)
+            except self.offline_errors:
+                pass
+            else:
+                for username in usernames:
+                    self.cache.invalidate(username)
+                    self.login_index.remove(username)
+                return deleted
+        await self._queue_delete(usernames)
+        return QUEUED
+
+    async def _queue_delete(self, usernames: list[str]) -> None:
+        # После отложенных регистраций, чтобы повтор журнала их не вернул
+        await asyncio.gather(*(
+            self.journal.append("delete_user", (username,), key=username.lower())
+            for username in usernames
+        ))
+        for username in usernames:
+            self.cache.invalidate(username)
+            self.login_index.remove(username)
+        logger.warning(f"Удаление аккаунтов ({len(usernames)}) отложено до восстановления БД")
+
+    async def update_passwords(
+        self,
+        pairs: list[tuple[str, str]],
+        notify: int | None = None
+    ) -> int | str:
+        """Массовая смена паролей: пары (логин, хеш); QUEUED — отложено в журнал."""
+        if not self._offline():
+            try:
+                updated = await self.run(self._update_passwords, pairs)
+            except self.offline_errors:
+                pass
+            else:
+                for username, _ in pairs:
+                    self.cache.invalidate(username)
+                return updated
+        await asyncio.gather(*(
+            self.journal.append("update_password", pair, key=pair[0].lower(), notify=notify)
+            for pair in pairs
+        ))
+        for username, _ in pairs:
+            self.cache.invalidate(username)
+        logger.warning(f"Смена паролей ({len(pairs)}) отложена до восстановления БД")
+        return QUEUED
+
+    async def filter_existing_logins(self, usernames: list[str]) -> list[str]:
+        """Логины из списка, которые есть в БД (в написании из БД)."""
+        return await self.run(self._filter_existing_logins, usernames)
+
+    async def count_logins(self, pattern: str) -> int:
+        """Число логинов по шаблону LIKE."""
+        return await self.run(self._count_logins, pattern, timeout=Config.DB_QUERY_TIMEOUT * 3)
+
+    async def iter_logins(self, pattern: str, chunk_size: int) -> AsyncIterator[list[str]]:
+        """Логины по шаблону LIKE порциями по алфавиту, без выборки всех сразу.
+
+        Страница начинается после последнего выданного логина, поэтому
+        удаление уже выданных строк не сдвигает следующие.
+        """
+        after = ""
+        while logins := await self.run(self._find_logins, pattern, after, chunk_size):
+            yield logins
+            after = logins[-1]
+
+    async def export_users(self, path: str, include_hashes: bool = False) -> int:
+        """Потоковая выгрузка таблицы users в CSV-файл."""
+        return await self.run(self._export_users, path, include_hashes, timeout=None)
+
+    async def check_existing_user(self, discord_id: int, username: str) -> bool:
+        """Проверка существования пользователя."""
+        by_discord_cached, by_discord = self.cache.get("discord", discord_id)
+        by_login_cached, by_login = self.cache.get("info", username)
+        if by_discord or by_login:
+            return True
+        if by_discord_cached and by_login_cached:
+            return False
+
+        generation = self.cache.generation()
+        exists = await self.run(self._check_existing_user, discord_id, username)
+        if not exists:
+            self.cache.set("discord", discord_id, None, generation)
+            self.cache.set("info", username, None, generation)
+            self.cache.set("password", username, None, generation)
+        return exists
+
+    async def update_password(
+        self,
+        username: str,
+        new_password: str,
+        notify: int | None = None
+    ) -> bool | str:
+        """Обновление пароля пользователя (QUEUED — отложено в журнал).
+
+        ``notify`` — кому сообщить, если отложенную смену БД отклонит.
+        """
+        if not self._offline():
+            try:
+                updated = await self.run(self._update_password, username, new_password)
+            except self.offline_errors:
+                pass
+            else:
+                self.cache.invalidate(username)
+                return updated
+        await self.journal.append(
+            "update_password", (username, new_password), key=username.lower(), notify=notify
+        )
+        self.cache.invalidate(username)
+        logger.warning(f"Смена пароля {username} отложена до восстановления БД")
+        return QUEUED
+
+    @classmethod
+    def add_rejection_handler(cls, handler: Callable[[dict, str], Awaitable[None]]) -> None:
+        """Обработчик отклонённой записи журнала: ``handler(запись, причина)``.
+
+        Пользователю уже ответили, что операция принята, поэтому
+        об отказе нужно сообщить, а не только записать в лог.
+        """
+        cls._rejection_handlers.append(handler)
+
+    @classmethod
+    def remove_rejection_handler(cls, handler: Callable[[dict, str], Awaitable[None]]) -> None:
+        if handler in cls._rejection_handlers:
+            cls._rejection_handlers.remove(handler)
+
+    async def replay_journal(self) -> int:
+        """Применение отложенных записей по порядку.
+
+        Повтор безопасен: регистрация считается применённой, если в БД
+        есть строка с её accessToken, смена пароля и удаление идемпотентны.
+        Временная ошибка останавливает применение без подтверждения
+        записей; отбрасываются только записи, которые БД отвергла из-за
+        их собственных данных.
+        """
+        applied = 0
+        async with self._replay_lock:
+            while records := self.journal.peek(Config.REG_BATCH_SIZE):
+                # Подряд идущие регистрации — одним пакетом
+                batch = [records[0]]
+                if batch[0]["op"] == "add_user":
+                    for record in records[1:]:
+                        if record["op"] != "add_user":
+                            break
+                        batch.append(record)
+                try:
+                    await self._apply_journal(batch)
+                except self.storage.data_errors as e:
+                    if len(batch) == 1:
+                        await self._reject(batch[0], str(e))
+                    else:
+                        # Неясно, какая строка пакета виновата: по одной
+                        for record in batch[:-1]:
+                            await self._apply_journal([record])
+                            await self.journal.ack(record["seq"])
+                        await self._apply_journal(batch[-1:])
+                await self.journal.ack(batch[-1]["seq"])
+                applied += len(batch)
+        if applied:
+            logger.info(f"Применено записей из журнала: {applied}")
+        return applied
+
+    async def _apply_journal(self, batch: list[dict]) -> None:
+        """Применение записей; отвергнутые из-за данных передаются в ``_reject``.
+
+        Остальные ошибки (недоступность, таймаут пула) пробрасываются:
+        записи остаются в журнале до следующей попытки.
+        """
+        record = batch[0]
+        if record["op"] == "delete_user":
+            username, = record["args"]
+            await self.run(self._delete_user, username)
+            self.cache.invalidate(username)
+            return
+        if record["op"] == "update_password":
+            username, password = record["args"]
+            try:
+                updated = await self.run(self._update_password, username, password)
+                # 0 строк и при повторе уже применённой записи: сверяем хеш
+                if not updated and await self.run(self._get_user_password, username) != password:
+                    await self._reject(record, "пользователь не найден")
+            except self.storage.data_errors as e:
+                await self._reject(record, str(e))
+            self.cache.invalidate(username)
+            return
+
+        rows = [tuple(record["args"]) for record in batch]
+        try:
+            results = await self.run(self._add_users, rows)
+        except self.storage.data_errors as e:
+            if len(batch) > 1:
+                raise
+            await self._reject(record, str(e))
+            results = [True]
+        for record, row, inserted in zip(batch, rows, results):
+            self.cache.invalidate(row[0], row[2])
+            if inserted is None:
+                await self._reject(record, "строка не принята БД")
+            elif not inserted:
+                await self._reject(record, "логин занят или аккаунт уже привязан")
+
+    async def _reject(self, record: dict, reason: str) -> None:
+        logger.error(
+            f"Запись журнала {record['seq']} ({record['op']}, {record['key']}) отброшена: {reason}"
+        )
+        for handler in self._rejection_handlers:
+            try:
+                await handler(record, reason)
+            except Exception as e:
+                logger.error(f"Обработчик отклонённой записи {record['seq']}: {str(e)}")
+
+    async def search_logins(self, query: str) -> list[str]:
+        """Поиск логинов по частичному совпадению."""
+        if self.login_index.loaded:
+            return self.login_index.search(query)
+        return await self.run(self._search_logins, query)
+
+    async def reload_login_index(self) -> int:
+        """Сверка индекса логинов с таблицей users."""
+        self.login_index.begin_reload()
+        try:
+            logins = await self.run(self._fetch_all_logins, timeout=Config.DB_QUERY_TIMEOUT * 3)
+        except BaseException:
+            self.login_index.abort_reload()
+            raise
+        self.login_index.replace_all(logins)
+        # Журнал ещё не применён: его регистрации и удаления поверх БД по порядку
+        for record in self.journal.peek(len(self.journal)):
+            if record["op"] == "add_user":
+                self.login_index.add(record["args"][0])
+            elif record["op"] == "delete_user":
+                self.login_index.remove(record["args"][0])
+        return len(self.login_index)
+
+    async def get_user_password(self, username: str) -> str | None:
+        """Получение хеша пароля пользователя."""
+        return await self._cached("password", username, self._get_user_password, username)
+
+    async def get_user_info(self, username: str) -> tuple | None:
+        """Получение информации о пользователе."""
+        info = await self._cached("info", username, self._get_user_info, username)
+        if info:
+            self.cache.link(username, info[1])
+        return info
+
+    async def get_user_by_discord_id(self, discord_id: int) -> tuple | None:
+        """Получение логина и хеша пароля по Discord ID."""
+        user = await self._cached("discord", discord_id, self._get_user_by_discord_id, discord_id)
+        if user:
+            self.cache.link(user[0], discord_id)
+        return user
+
+    async def warmup(self) -> None:
+        """Прогрев пула соединений в потоке БД."""
+        await self.run(self.storage.fill, timeout=None, breaker=False)
+
+    async def migrate(self) -> list[int]:
+        """Применение миграций схемы и проверка индексов."""
+        async with DatabaseManager._migrate_lock:
+            try:
+                return await self.run(self._migrate, timeout=None)
+            except self.offline_errors:
+                raise
+            except Exception:
+                # Например, дубликаты в старой таблице не дают создать индекс
+                DatabaseManager._schema_verified = False
+                logger.warning("Уникальность не гарантирована схемой: регистрация проверяет занятость явно")
+                raise
+
+    async def explain_queries(self) -> list[tuple[str, list[str], bool, bool]]:
+        """Планы запросов: (имя, план, полный проход, проход ожидаем)."""
+        return await self.run(self._explain_queries)
+
+    def expected_seconds(self, queries: int = 1) -> float:
+        """Ожидаемое время ``queries`` запросов; при разомкнутой цепи ответ сразу."""
+        if not self.available:
+            return 0.0
+        return self.latency.value * queries
+
+    def user_cached(self, discord_id: int) -> bool:
+        """Ответит ли ``get_user_by_discord_id`` из кеша, без запроса к БД."""
+        return ("discord", discord_id) in self.cache
+
+    @property
+    def available(self) -> bool:
+        """Доступность БД по последним вызовам и проверкам (без запроса)."""
+        return self.breaker.state != CircuitBreaker.OPEN
+
+    async def health_check(self) -> bool:
+        """Фоновая проверка БД; в разомкнутом состоянии ждёт ``reset_timeout``.
+
+        В полуоткрытом состоянии проверка служит пробным вызовом;
+        после восстановления пул заново прогревается.
+        """
+        if not self.breaker.allow():
+            return False
+        recovering = self.breaker.state != CircuitBreaker.CLOSED
+        try:
+            await self.run(self._ping, timeout=Config.DB_CONNECT_TIMEOUT, breaker=False)
+        except Exception as e:
+            self.breaker.record_failure()
+            logger.debug(f"Проверка БД не прошла: {str(e)}")
+            return False
+        except BaseException:
+            self.breaker.release()
+            raise
+        self.breaker.record_success()
+        if recovering:
+            try:
+                await self.run(self.storage.fill, timeout=None, breaker=False)
+            except Exception as e:
+                # Пул доберётся до размера по запросам; журнал применяем всё равно
+                logger.warning(f"Пул не прогрет после восстановления: {str(e)}")
+        if DatabaseManager._schema_verified is None and not DatabaseManager._migrate_lock.locked():
+            # БД была недоступна при старте (если миграции не идут прямо сейчас)
+            try:
+                await self.migrate()
+            except Exception as e:
+                logger.error(f"Миграции не применены: {str(e)}")
+        if len(self.journal):
+            try:
+                await self.replay_journal()
+            except Exception as e:
+                logger.error(f"Журнал применён не полностью: {str(e)}")
+        return True
+
+    # Блокирующие реализации, выполняются в потоках БД
 
-    def add_user(self, user_data: tuple) -> None:
-        """Добавление пользователя в БД."""
+    def _add_user(self, user_data: tuple) -> None:
         with self.get_cursor() as cursor:
+            cursor.execute(SQL["add_user"], user_data)
+
+    def _add_users(self, rows: list[tuple]) -> list[bool | None]:
+        """Пакетная вставка: строки-конфликты пропускаются ограничениями БД,
+        успешность каждой строки определяется по её accessToken.
+
+        None — строка не вставлена, но и конфликта нет: INSERT IGNORE
+        пропустил другую ошибку (например, обрезку значения).
+        """
+        with self.get_cursor() as cursor:
+            cursor.executemany(SQL["add_users"], rows)
+            placeholders = ", ".join("?" * len(rows))
             cursor.execute(
-                """INSERT INTO users 
-                (username, password, discord_id, serverID, accessToken) 
-                VALUES (?, ?, ?, ?, ?)""",
-                user_data
+                SQL["tokens_by_logins"].format(placeholders=placeholders),
+                [row[0] for row in rows]
             )
+            stored = {row[0] for row in cursor.fetchall()}
+            results = []
+            for row in rows:
+                if row[4] in stored:
+                    results.append(True)
+                    continue
+                cursor.execute(SQL["check_existing_user"], (row[2], row[0]))
+                results.append(False if cursor.fetchone() else None)
+            return results
 
-    def delete_user(self, username: str) -> int:
-        """Удаление пользователя из БД."""
+    def _delete_user(self, username: str) -> int:
         with self.get_cursor() as cursor:
-            cursor.execute(
-                "DELETE FROM users WHERE username = ?", 
-                (username,)
+            cursor.execute(SQL["delete_user"], (username,))
+            return cursor.rowcount
+
+    def _delete_users(self, usernames: list[str]) -> int:
+        with self.get_cursor() as cursor:
+            cursor.executemany(SQL["delete_user"], [(username,) for username in usernames])
+            return cursor.rowcount
+
+    def _update_passwords(self, pairs: list[tuple[str, str]]) -> int:
+        with self.get_cursor() as cursor:
+            cursor.executemany(
+                SQL["update_password"],
+                [(password, username) for username, password in pairs]
             )
             return cursor.rowcount
 
-    def check_existing_user(self, discord_id: int, username: str) -> bool:
-        """Проверка существования пользователя."""
+    def _filter_existing_logins(self, usernames: list[str]) -> list[str]:
+        if not usernames:
+            return []
+        placeholders = ", ".join("?" * len(usernames))
         with self.get_cursor() as cursor:
             cursor.execute(
-                "SELECT username FROM users WHERE discord_id = ? OR username = ?",
-                (discord_id, username)
+                SQL["filter_existing_logins"].format(placeholders=placeholders),
+                usernames
             )
+            return [row[0] for row in cursor.fetchall()]
+
+    def _find_logins(self, pattern: str, after: str, limit: int) -> list[str]:
+        with self.get_cursor() as cursor:
+            cursor.execute(SQL["find_logins"], (pattern, after, limit))
+            return [row[0] for row in cursor.fetchall()]
+
+    def _count_logins(self, pattern: str) -> int:
+        with self.get_cursor() as cursor:
+            cursor.execute(SQL["count_logins"], (pattern,))
+            return cursor.fetchone()[0]
+
+    def _export_users(self, path: str, include_hashes: bool) -> int:
+        columns = ["username", "uuid", "discord_id", "serverID"]
+        if include_hashes:
+            columns.append("password")
+        count = 0
+        with (
+            self.get_cursor(buffered=False) as cursor,
+            open(path, "w", newline="", encoding="utf-8") as f
+        ):
+            writer = csv.writer(f)
+            writer.writerow(columns)
+            cursor.execute(f"SELECT {', '.join(columns)} FROM users ORDER BY username")
+            while rows := cursor.fetchmany(Config.BULK_CHUNK_SIZE):
+                writer.writerows(rows)
+                count += len(rows)
+        return count
+
+    def _check_existing_user(self, discord_id: int, username: str) -> bool:
+        with self.get_cursor() as cursor:
+            cursor.execute(SQL["check_existing_user"], (discord_id, username))
             return cursor.fetchone() is not None
 
-    def update_password(self, username: str, new_password: str) -> bool:
-        """Обновление пароля пользователя."""
+    def _update_password(self, username: str, new_password: str) -> bool:
         with self.get_cursor() as cursor:
-            cursor.execute(
-                "UPDATE users SET password = ? WHERE username = ?",
-                (new_password, username)
-            )
+            cursor.execute(SQL["update_password"], (new_password, username))
             return cursor.rowcount > 0
 
-    def search_logins(self, query: str) -> list[str]:
-        """Поиск логинов по частичному совпадению."""
+    def _search_logins(self, query: str) -> list[str]:
         with self.get_cursor() as cursor:
-            cursor.execute(
-                "SELECT username FROM users WHERE username LIKE ? LIMIT 10",
-                (f"%{query}%",)
-            )
+            cursor.execute(SQL["search_logins"], (f"%{escape_like(query)}%",))
             return [row[0] for row in cursor.fetchall()]
 
-    def get_user_password(self, username: str) -> str | None:
-        """Получение хеша пароля пользователя."""
+    def _fetch_all_logins(self) -> list[str]:
         with self.get_cursor() as cursor:
-            cursor.execute(
-                "SELECT password FROM users WHERE username = ?",
-                (username,)
-            )
+            cursor.execute(SQL["fetch_all_logins"])
+            return [row[0] for row in cursor.fetchall()]
+
+    def _get_user_password(self, username: str) -> str | None:
+        with self.get_cursor() as cursor:
+            cursor.execute(SQL["get_user_password"], (username,))
             result = cursor.fetchone()
             return result[0] if result else None
 
-    def get_user_info(self, username: str) -> tuple | None:
-        """Получение информации о пользователе."""
+    def _get_user_info(self, username: str) -> tuple | None:
         with self.get_cursor() as cursor:
-            cursor.execute(
-                """SELECT uuid, discord_id, serverID 
-                FROM users 
-                WHERE username = ?""",
-                (username,)
-            )
+            cursor.execute(SQL["get_user_info"], (username,))
             return cursor.fetchone()
 
-    def is_connected(self) -> bool:
-        """Проверка подключения к БД."""
-        try:
-            with self.get_cursor() as cursor:
-                cursor.execute("SELECT 1")
-                return True
-        except Exception:
-            return False
+    def _get_user_by_discord_id(self, discord_id: int) -> tuple | None:
+        with self.get_cursor() as cursor:
+            cursor.execute(SQL["get_user_by_discord_id"], (discord_id,))
+            return cursor.fetchone()
+
+    def _migrate(self) -> list[int]:
+        with self.get_cursor() as cursor:
+            applied = migrations.migrate(cursor, self.storage)
+            problems = migrations.verify(cursor, self.storage)
+            for problem in problems:
+                logger.warning(problem)
+            # Без индексов регистрация проверяет занятость явно
+            DatabaseManager._schema_verified = not problems
+            return applied
+
+    def _explain_queries(self) -> list[tuple[str, list[str], bool, bool]]:
+        results = []
+        with self.get_cursor() as cursor:
+            for name, (params, scan_expected) in EXPLAIN_CASES.items():
+                query = SQL[name].format(placeholders="?")
+                plan, full_scan = self.storage.explain(cursor, query, params)
+                results.append((name, plan, full_scan, scan_expected))
+        return results
+
+    def _ping(self) -> bool:
+        with self.get_cursor() as cursor:
+            cursor.execute("SELECT 1")
+            return True
+
+
+def require_database():
+    """Проверка app-команды: при недоступной БД команда отклоняется сразу.
+
+    Ставится выше ``has_permissions``: без прав ответ — отказ в доступе, а не статус БД.
+    """
+
+    async def predicate(interaction) -> bool:
+        breaker = DatabaseManager._breaker
+        if breaker is not None and breaker.state == CircuitBreaker.OPEN:
+            raise CircuitOpenError(breaker.name, breaker.retry_after)
+        return True
+
+    return app_commands.check(predicate)
@@ -0,0 +1,130 @@
+import time
+import asyncio
+from concurrent.futures import ProcessPoolExecutor
+from typing import Callable
+from config import Config
+from utils.helpers import hash_password, verify_password
+from utils.metrics import metrics, LatencyEstimate
+
+
+class HashingBusyError(Exception):
+    """Очередь хеширования переполнена или превышен лимит пользователя."""
+
+
+class PasswordHasher:
+    """Асинхронный сервис bcrypt поверх пула процессов.
+
+    Задачи сверх ``workers + queue_size`` и параллельные запросы одного
+    пользователя сверх ``per_user`` отклоняются сразу, а не копятся в очереди.
+    """
+
+    def __init__(
+        self,
+        rounds: int = 12,
+        workers: int = 1,
+        queue_size: int = 32,
+        per_user: int = 1
+    ):
+        self.rounds = rounds
+        self.workers = max(1, workers)
+        self.queue_size = max(0, queue_size)
+        self.per_user = max(1, per_user)
+        self._executor: ProcessPoolExecutor | None = None
+        self._pending = 0
+        self._per_user_active: dict[int, int] = {}
+        # Время одного хеша; до прогрева оценка заведомо с запасом
+        self.latency = LatencyEstimate(initial=1.0)
+
+    def _get_executor(self) -> ProcessPoolExecutor:
+        if self._executor is None:
+            self._executor = ProcessPoolExecutor(max_workers=self.workers)
+        return self._executor
+
+    async def _submit(self, user_id: int | None, func: Callable, *args):
+        if self._pending >= self.workers + self.queue_size:
+            raise HashingBusyError("Очередь хеширования переполнена")
+        if user_id is not None and self._per_user_active.get(user_id, 0) >= self.per_user:
+            raise HashingBusyError(f"Лимит хеширования для {user_id}")
+
+        self._pending += 1
+        if user_id is not None:
+            self._per_user_active[user_id] = self._per_user_active.get(user_id, 0) + 1
+        queued = self._pending > self.workers
+        start = time.perf_counter()
+        try:
+            loop = asyncio.get_running_loop()
+            with metrics.timer("bcrypt"):
+                result = await loop.run_in_executor(self._get_executor(), func, *args)
+            if not queued:
+                self.latency.observe(time.perf_counter() - start)
+            return result
+        finally:
+            self._pending -= 1
+            if user_id is not None:
+                left = self._per_user_active[user_id] - 1
+                if left:
+                    self._per_user_active[user_id] = left
+                else:
+                    del self._per_user_active[user_id]
+
+    async def hash(self, password: str, user_id: int | None = None) -> str:
+        """Хеширование пароля с настроенной стоимостью."""
+        return await self._submit(user_id, hash_password, password, self.rounds)
+
+    async def hash_many(self, passwords: list[str]) -> list[str]:
+        """Хеширование списка паролей для массовых операций.
+
+        Пароли отправляются порциями по числу процессов и учитываются
+        в общей очереди, чтобы интерактивные команды видели нагрузку.
+        """
+        loop = asyncio.get_running_loop()
+        executor = self._get_executor()
+        hashes = []
+        for i in range(0, len(passwords), self.workers):
+            part = passwords[i:i + self.workers]
+            self._pending += len(part)
+            try:
+                with metrics.timer("bcrypt"):
+                    hashes += await asyncio.gather(*(
+                        loop.run_in_executor(executor, hash_password, password, self.rounds)
+                        for password in part
+                    ))
+            finally:
+                self._pending -= len(part)
+        return hashes
+
+    async def warmup(self) -> None:
+        """Запуск процессов пула заранее, чтобы первая команда их не ждала.
+
+        Один хеш с настроенной стоимостью задаёт начальную оценку времени.
+        """
+        loop = asyncio.get_running_loop()
+        executor = self._get_executor()
+        await asyncio.gather(*(
+            loop.run_in_executor(executor, hash_password, "", 4) for _ in range(self.workers)
+        ))
+        start = time.perf_counter()
+        await loop.run_in_executor(executor, hash_password, "", self.rounds)
+        self.latency.value = time.perf_counter() - start
+
+    def expected_seconds(self, count: int = 1) -> float:
+        """Ожидаемое время ``count`` хешей с учётом текущей очереди."""
+        return self.latency.value * (count + self._pending // self.workers)
+
+    async def verify(self, password: str, hashed: str, user_id: int | None = None) -> bool:
+        """Проверка пароля по хешу."""
+        return await self._submit(user_id, verify_password, password, hashed)
+
+    def shutdown(self) -> None:
+        """Остановка пула процессов."""
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
+
+
+password_hasher = PasswordHasher(
+    rounds=Config.BCRYPT_ROUNDS,
+    workers=Config.HASH_WORKERS,
+    queue_size=Config.HASH_QUEUE_SIZE,
+    per_user=Config.HASH_PER_USER
+)
@@ -1,64 +1,55 @@
 import uuid
-import bcrypt
-import re
-import discord
+import string
 import secrets
-from typing import Optional
-from PIL import Image
-import io
+import resource
+from typing import TYPE_CHECKING
 
-async def validate_image(file: discord.Attachment) -> str:
-    """Проверка PNG файла"""
-    if file.size > 256 * 1024:
-        return "❌ Файл слишком большой (макс. 256KB)"
-    
-    if not file.filename.lower().endswith('.png'):
-        return "❌ Только PNG файлы разрешены"
-    
-    try:
-        content = await file.read()
-        img = Image.open(io.BytesIO(content))
-        if img.format != 'PNG':
-            return "❌ Это не PNG файл"
-            
-        # Проверка размеров для скина
-        if img.size != (64, 64):
-            return "❌ Неверный размер (требуется 64x64)"
+if TYPE_CHECKING:
+    import discord
 
-    except Exception:
-        return "❌ Некорректный файл изображения"
-    
-    return None
+async def validate_image(file: "discord.Attachment") -> str:
+    """Проверка PNG файла скина"""
+    from utils.skins import skin_validator
+    error, _ = await skin_validator.validate(file)
+    return error
 
 def generate_error_code(length: int = 6) -> str:
     return secrets.token_hex(length // 2 + 1)[:length].upper()
 
-def hash_password(password: str) -> str:
-    return bcrypt.hashpw(password.encode(), bcrypt.gensalt()).decode()
+def hash_password(password: str, rounds: int = 12) -> str:
+    import bcrypt  # выполняется в процессах хеширования
+    return bcrypt.hashpw(password.encode(), bcrypt.gensalt(rounds)).decode()
 
 def verify_password(password: str, hashed_password: str) -> bool:
+    import bcrypt
     return bcrypt.checkpw(password.encode(), hashed_password.encode())
 
-def validate_username(username: str) -> Optional[str]:
-    if not 3 <= len(username) <= 16:
-        return "Длина логина должна быть от 3 до 16 символов"
-    
-    if not re.match(r"^[a-zA-Z0-9_]+$", username):
-        return "Логин может содержать только буквы, цифры и подчёркивание"
-    
-    return None
+# Символы для генерации паролей по классам из PASSWORD_CLASSES
+PASSWORD_ALPHABETS = {
+    "upper": string.ascii_uppercase,
+    "lower": string.ascii_lowercase,
+    "digit": string.digits,
+    "special": "!#$%&*+-=?@_",
+}
+
+def generate_password(length: int = 12, attempts: int = 10) -> str:
+    """Случайный пароль, проходящий текущую политику.
 
-def validate_password(password: str) -> Optional[str]:
-    if len(password) < 8:
-        return "Пароль должен содержать минимум 8 символов"
-    
-    if not any(c.isupper() for c in password):
-        return "Пароль должен содержать хотя бы одну заглавную букву"
-    
-    if not any(c.isdigit() for c in password):
-        return "Пароль должен содержать хотя бы одну цифру"
-    
-    return None
+    По символу каждого требуемого класса ставится сразу, поэтому повтор
+    нужен только при совпадении с фильтром утёкших паролей.
+    """
+    from utils.validation import policy
+    length = max(length, policy.password_min)
+    alphabet = "".join(PASSWORD_ALPHABETS.values())
+    rng = secrets.SystemRandom()
+    for _ in range(attempts):
+        chars = [secrets.choice(PASSWORD_ALPHABETS[name]) for name in policy.password_require]
+        chars += [secrets.choice(alphabet) for _ in range(length - len(chars))]
+        rng.shuffle(chars)
+        password = "".join(chars)
+        if policy.validate_password(password) is None:
+            return password
+    raise RuntimeError(f"Не удалось сгенерировать пароль по политике за {attempts} попыток")
 
 def generate_access_token() -> str:
     return str(uuid.uuid4())
@@ -67,4 +58,12 @@ def sanitize_input(text: str) -> str:
     return text.strip()[:32]
 
 def format_player_uuid(uuid_str: str) -> str:
-    return str(uuid.UUID(uuid_str))
\ No newline at end of file
+    return str(uuid.UUID(uuid_str))
+
+def get_rss_bytes() -> int:
+    """Текущий RSS процесса (пиковый, если /proc недоступен)."""
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * resource.getpagesize()
+    except OSError:
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024
@@ -0,0 +1,128 @@
+import time
+import asyncio
+import logging
+import discord
+from contextlib import asynccontextmanager
+from config import Config
+from utils.metrics import metrics
+
+logger = logging.getLogger("discord_bot")
+
+# Discord ждёт первый ответ на взаимодействие не дольше 3 секунд
+RESPONSE_WINDOW = 3.0
+
+
+class Responder:
+    """Ответ на команду с наименьшим числом запросов к Discord.
+
+    Пока первый ответ не отправлен, ``send`` отвечает одним
+    ``response.send_message``. ``defer`` делается только в ``prepare``,
+    если ожидаемая работа с запасом ``RESPONSE_DEFER_MARGIN`` не укладывается
+    в оставшееся окно, или явно — перед заведомо долгими операциями.
+    Если оценка не оправдалась и за ``RESPONSE_DEFER_MARGIN`` до конца окна
+    ответа всё ещё нет, сторож делает ``defer`` сам.
+    """
+
+    def __init__(self, interaction: discord.Interaction, ephemeral: bool = True):
+        self.interaction = interaction
+        self.ephemeral = ephemeral
+        # Окно отсчитывается от создания взаимодействия, а не от вызова команды
+        age = (discord.utils.utcnow() - interaction.created_at).total_seconds()
+        self.started = time.monotonic() - min(max(age, 0.0), RESPONSE_WINDOW)
+        # Первый ответ уже отправляется: выставляется до await, сторож его видит
+        self._responding: asyncio.Event | None = None
+        self._watchdog_task: asyncio.Task | None = None
+        self._watchdog = asyncio.get_running_loop().call_later(
+            max(0.0, self.remaining - Config.RESPONSE_DEFER_MARGIN), self._on_deadline
+        )
+
+    @property
+    def remaining(self) -> float:
+        """Секунды, оставшиеся до конца окна первого ответа."""
+        return RESPONSE_WINDOW - (time.monotonic() - self.started)
+
+    @property
+    def acknowledged(self) -> bool:
+        """Первый ответ отправлен или отправляется."""
+        return self._responding is not None or self.interaction.response.is_done()
+
+    async def prepare(self, expected: float) -> None:
+        """Отложенный ответ, если ``expected`` секунд работы не уложатся в окно."""
+        if self.acknowledged:
+            return
+        if expected + Config.RESPONSE_DEFER_MARGIN >= self.remaining:
+            await self.defer()
+
+    def _on_deadline(self) -> None:
+        if not self.acknowledged:
+            self._watchdog_task = asyncio.create_task(self._deadline_defer())
+
+    async def _deadline_defer(self) -> None:
+        try:
+            await self.defer()
+        except discord.HTTPException as e:
+            logger.warning(f"Сторож не смог отложить ответ: {str(e)}")
+
+    def _claim(self) -> asyncio.Event | None:
+        """Синхронно занять первый ответ; ``None``, если он уже занят."""
+        if self.acknowledged:
+            return None
+        self._responding = asyncio.Event()
+        self._watchdog.cancel()
+        return self._responding
+
+    @asynccontextmanager
+    async def _first_response(self, claimed: asyncio.Event):
+        try:
+            yield
+        except BaseException:
+            # Ответ не ушёл: следующий send снова попробует ответить первым
+            self._responding = None
+            raise
+        finally:
+            claimed.set()
+
+    async def _settle(self) -> None:
+        """Дождаться первого ответа, который отправляет другая задача."""
+        if self._responding is not None:
+            await self._responding.wait()
+
+    async def defer(self) -> None:
+        """Отложенный ответ («думает…»), если ответа ещё не было."""
+        claimed = self._claim()
+        if claimed is None:
+            await self._settle()
+            return
+        async with self._first_response(claimed):
+            with metrics.timer("defer"):
+                await self.interaction.response.defer(ephemeral=self.ephemeral)
+        self._responded("deferred")
+
+    async def send(self, *args, **kwargs):
+        """Сообщение пользователю: первым ответом или followup после defer.
+
+        ``wait=True`` (объект сообщения для правок) возможен только после ``defer``.
+        """
+        kwargs.setdefault("ephemeral", self.ephemeral)
+        claimed = self._claim()
+        if claimed is None:
+            await self._settle()
+            with metrics.timer("followup"):
+                return await self.interaction.followup.send(*args, **kwargs)
+        async with self._first_response(claimed):
+            with metrics.timer("respond"):
+                await self.interaction.response.send_message(*args, **kwargs)
+        self._responded("direct")
+        return None
+
+    def _responded(self, mode: str) -> None:
+        elapsed = time.monotonic() - self.started
+        command = self.interaction.command.qualified_name if self.interaction.command else "unknown"
+        if metrics.enabled:
+            metrics.responses_total.inc(command=command, mode=mode)
+            metrics.observe_phase("first_response", elapsed)
+        logger.info(
+            f"Первый ответ на {command} через {elapsed * 1000:.1f} мс "
+            f"({'сразу' if mode == 'direct' else 'defer'})",
+            extra={"duration": round(elapsed, 4)}
+        )
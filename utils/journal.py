@@ -0,0 +1,110 @@
+import os
+import json
+import time
+import asyncio
+import logging
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from itertools import islice
+from typing import Any
+from utils.batching import BatchWriter
+
+logger = logging.getLogger("discord_bot")
+
+
+class WriteJournal:
+    """Журнал записей, отложенных до восстановления БД.
+
+    Файл JSON Lines только дописывается: операция ``{"seq", "op", "key",
+    "args", "notify"?}`` подтверждается после ``fsync``, параллельные записи
+    объединяются в один ``fsync`` через ``BatchWriter``. Применённые
+    записи отмечаются строкой ``{"done": seq}``; опустевший журнал
+    обрезается. Все файловые операции идут по очереди в одном потоке.
+    """
+
+    def __init__(self, path: str, max_batch: int = 100, window: float = 0.005):
+        self.path = path
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="journal")
+        self._writer = BatchWriter(self._write_batch, max_batch=max_batch, window=window)
+        self._pending: deque[dict[str, Any]] = deque()
+        self._inflight = 0
+        self._seq = 0
+        self._load()
+        fd = os.open(path, os.O_WRONLY | os.O_APPEND | os.O_CREAT, 0o600)
+        self._file = os.fdopen(fd, "a", encoding="utf-8")
+
+    def _load(self) -> None:
+        """Чтение незавершённых записей после перезапуска."""
+        if not os.path.exists(self.path):
+            return
+        done = 0
+        records = []
+        with open(self.path, encoding="utf-8") as f:
+            for line in f:
+                try:
+                    record = json.loads(line)
+                except json.JSONDecodeError:
+                    # Оборванная при сбое строка: подтверждения по ней не было
+                    logger.warning("Журнал: повреждённая запись пропущена")
+                    continue
+                if "done" in record:
+                    done = max(done, record["done"])
+                else:
+                    records.append(record)
+        self._seq = max([done] + [record["seq"] for record in records])
+        self._pending.extend(record for record in records if record["seq"] > done)
+        if self._pending:
+            logger.warning(f"В журнале {len(self._pending)} неприменённых записей")
+
+    def __len__(self) -> int:
+        """Записи, ещё не применённые к БД (включая ожидающие fsync)."""
+        return len(self._pending) + self._inflight
+
+    async def append(self, op: str, args: tuple | list, key: str, notify: int | None = None) -> None:
+        """Запись операции; возвращается, когда она на диске.
+
+        ``notify`` — Discord ID, кому сообщить, если БД потом отклонит запись.
+        """
+        self._seq += 1
+        record = {"seq": self._seq, "op": op, "key": key, "args": list(args), "ts": time.time()}
+        if notify is not None:
+            record["notify"] = notify
+        self._inflight += 1
+        try:
+            await self._writer.submit(record)
+        finally:
+            self._inflight -= 1
+        self._pending.append(record)
+
+    def peek(self, limit: int) -> list[dict[str, Any]]:
+        """Первые ``limit`` неприменённых записей по порядку."""
+        return list(islice(self._pending, limit))
+
+    async def ack(self, seq: int) -> None:
+        """Отметка записей до ``seq`` включительно как применённых."""
+        while self._pending and self._pending[0]["seq"] <= seq:
+            self._pending.popleft()
+        loop = asyncio.get_running_loop()
+        if not self._pending and not self._inflight:
+            # Новые записи встанут в очередь потока после обрезки
+            await loop.run_in_executor(self._executor, self._truncate)
+        else:
+            await loop.run_in_executor(self._executor, self._write, json.dumps({"done": seq}) + "\n")
+
+    async def _write_batch(self, records: list[dict[str, Any]]) -> list[None]:
+        data = "".join(json.dumps(record, ensure_ascii=False) + "\n" for record in records)
+        await asyncio.get_running_loop().run_in_executor(self._executor, self._write, data)
+        return [None] * len(records)
+
+    def _write(self, data: str) -> None:
+        self._file.write(data)
+        self._file.flush()
+        os.fsync(self._file.fileno())
+
+    def _truncate(self) -> None:
+        self._file.truncate(0)
+        os.fsync(self._file.fileno())
+
+    def close(self) -> None:
+        self._executor.shutdown(wait=True)
+        self._file.close()
@@ -0,0 +1,93 @@
+import copy
+import json
+import queue
+import atexit
+import logging
+import logging.handlers
+from config import Config
+from utils.metrics import current_command, current_user
+
+TEXT_FORMAT = "%(asctime)s [%(levelname)s] %(message)s"
+
+# Дополнительные поля записи, попадающие в JSON
+EXTRA_FIELDS = ("error_code", "command", "user_id", "duration")
+
+
+class JsonFormatter(logging.Formatter):
+    """Запись лога одной строкой JSON."""
+
+    def format(self, record: logging.LogRecord) -> str:
+        data = {
+            "time": self.formatTime(record),
+            "level": record.levelname,
+            "logger": record.name,
+            "message": record.getMessage(),
+        }
+        for field in EXTRA_FIELDS:
+            value = getattr(record, field, None)
+            if value is not None:
+                data[field] = value
+        if record.exc_info and not record.exc_text:
+            record.exc_text = self.formatException(record.exc_info)
+        if record.exc_text:
+            data["exc_info"] = record.exc_text
+        return json.dumps(data, ensure_ascii=False, default=str)
+
+
+class ContextQueueHandler(logging.handlers.QueueHandler):
+    """QueueHandler, добавляющий команду и пользователя из контекста.
+
+    В очередь уходит копия записи с уже подставленными аргументами и
+    текстом исключения, форматирование выполняет фоновый поток.
+    """
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        record = copy.copy(record)
+        if getattr(record, "command", None) is None:
+            record.command = current_command.get()
+        if getattr(record, "user_id", None) is None:
+            record.user_id = current_user.get()
+        record.msg = record.getMessage()
+        record.args = None
+        if record.exc_info:
+            record.exc_text = logging.Formatter().formatException(record.exc_info)
+            record.exc_info = None
+        return record
+
+
+def _file_handler() -> logging.Handler:
+    if Config.LOG_ROTATE_WHEN:
+        return logging.handlers.TimedRotatingFileHandler(
+            Config.LOG_FILE,
+            when=Config.LOG_ROTATE_WHEN,
+            backupCount=Config.LOG_BACKUP_COUNT,
+            encoding="utf-8"
+        )
+    return logging.handlers.RotatingFileHandler(
+        Config.LOG_FILE,
+        maxBytes=Config.LOG_MAX_BYTES,
+        backupCount=Config.LOG_BACKUP_COUNT,
+        encoding="utf-8"
+    )
+
+
+def setup_logging() -> logging.handlers.QueueListener:
+    """Логирование через очередь: запись в файл и консоль в фоновом потоке."""
+    file_handler = _file_handler()
+    file_handler.setFormatter(JsonFormatter() if Config.LOG_JSON else logging.Formatter(TEXT_FORMAT))
+    stream_handler = logging.StreamHandler()
+    stream_handler.setFormatter(logging.Formatter(TEXT_FORMAT))
+
+    log_queue = queue.SimpleQueue()
+    root = logging.getLogger()
+    root.setLevel(Config.LOG_LEVEL.upper())
+    for handler in root.handlers[:]:
+        root.removeHandler(handler)
+    root.addHandler(ContextQueueHandler(log_queue))
+
+    listener = logging.handlers.QueueListener(
+        log_queue, file_handler, stream_handler, respect_handler_level=True
+    )
+    listener.start()
+    atexit.register(listener.stop)
+    return listener
@@ -0,0 +1,128 @@
+from bisect import bisect_left, insort
+from heapq import nsmallest
+from typing import Iterable
+
+NGRAM_SIZE = 3
+
+
+def _ngrams(key: str) -> set[str]:
+    """Все подстроки ключа длиной от 1 до NGRAM_SIZE."""
+    return {
+        key[i:i + n]
+        for n in range(1, NGRAM_SIZE + 1)
+        for i in range(len(key) - n + 1)
+    }
+
+
+class LoginIndex:
+    """Индекс логинов в памяти для автодополнения.
+
+    Префиксы ищутся бинарным поиском по отсортированному списку,
+    подстроки — пересечением множеств n-грамм. Регистр не учитывается,
+    как и в ``LIKE`` MariaDB.
+    """
+
+    def __init__(self):
+        self.loaded = False
+        self._keys: list[str] = []
+        self._names: dict[str, str] = {}
+        self._grams: dict[str, set[str]] = {}
+        self._pending: list[tuple[bool, str]] | None = None
+
+    def __len__(self) -> int:
+        return len(self._keys)
+
+    def __contains__(self, name: str) -> bool:
+        return name.lower() in self._names
+
+    def _add(self, name: str) -> None:
+        key = name.lower()
+        if key in self._names:
+            return
+        self._names[key] = name
+        insort(self._keys, key)
+        for gram in _ngrams(key):
+            self._grams.setdefault(gram, set()).add(key)
+
+    def _remove(self, name: str) -> None:
+        key = name.lower()
+        if self._names.pop(key, None) is None:
+            return
+        del self._keys[bisect_left(self._keys, key)]
+        for gram in _ngrams(key):
+            bucket = self._grams.get(gram)
+            if bucket is not None:
+                bucket.discard(key)
+                if not bucket:
+                    del self._grams[gram]
+
+    def add(self, name: str) -> None:
+        """Добавление логина."""
+        self._add(name)
+        if self._pending is not None:
+            self._pending.append((True, name))
+
+    def remove(self, name: str) -> None:
+        """Удаление логина."""
+        self._remove(name)
+        if self._pending is not None:
+            self._pending.append((False, name))
+
+    def begin_reload(self) -> None:
+        """Начало сверки с БД: изменения до replace_all будут повторены."""
+        self._pending = []
+
+    def abort_reload(self) -> None:
+        """Отмена сверки без замены данных."""
+        self._pending = None
+
+    def replace_all(self, names: Iterable[str]) -> None:
+        """Замена содержимого индекса выгрузкой из БД."""
+        pending, self._pending = self._pending or [], None
+        self._keys, self._names, self._grams = [], {}, {}
+        for name in names:
+            key = name.lower()
+            if key in self._names:
+                continue
+            self._names[key] = name
+            self._keys.append(key)
+            for gram in _ngrams(key):
+                self._grams.setdefault(gram, set()).add(key)
+        self._keys.sort()
+        # Изменения, сделанные ботом во время выгрузки
+        for added, name in pending:
+            if added:
+                self._add(name)
+            else:
+                self._remove(name)
+        self.loaded = True
+
+    def search(self, query: str, limit: int = 25) -> list[str]:
+        """Логины, содержащие ``query``; сначала совпадения по префиксу."""
+        query = query.lower()
+        if not query:
+            return [self._names[key] for key in self._keys[:limit]]
+
+        result = []
+        start = bisect_left(self._keys, query)
+        for key in self._keys[start:start + limit]:
+            if not key.startswith(query):
+                break
+            result.append(key)
+        if len(result) >= limit:
+            return [self._names[key] for key in result]
+
+        if len(query) <= NGRAM_SIZE:
+            candidates = self._grams.get(query, set())
+        else:
+            buckets = sorted(
+                (self._grams.get(query[i:i + NGRAM_SIZE], set())
+                 for i in range(len(query) - NGRAM_SIZE + 1)),
+                key=len
+            )
+            candidates = set.intersection(*buckets) if buckets[0] else set()
+
+        seen = set(result)
+        matches = (key for key in candidates if key not in seen and query in key)
+        result.extend(nsmallest(limit - len(result), matches))
+        return [self._names[key] for key in result]
@@ -0,0 +1,304 @@
+import time
+import logging
+import discord
+from bisect import bisect_left
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Callable, Dict, Any
+from discord import app_commands
+from config import Config
+
+DEFAULT_BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+logger = logging.getLogger("discord_bot")
+
+# Команда и пользователь, чьё взаимодействие обрабатывается в текущей задаче
+current_command: ContextVar[str | None] = ContextVar("current_command", default=None)
+current_user: ContextVar[int | None] = ContextVar("current_user", default=None)
+
+
+def _format_labels(names: tuple[str, ...], values: tuple, extra: str = "") -> str:
+    pairs = [f'{name}="{value}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+class Counter:
+    """Счётчик с метками."""
+
+    type = "counter"
+
+    def __init__(self, name: str, doc: str, labels: tuple[str, ...] = ()):
+        self.name = name
+        self.doc = doc
+        self.labels = labels
+        self.values: dict[tuple, float] = {}
+
+    def inc(self, amount: float = 1, **labels) -> None:
+        key = tuple(labels[name] for name in self.labels)
+        self.values[key] = self.values.get(key, 0) + amount
+
+    def render(self) -> list[str]:
+        return [
+            f"{self.name}{_format_labels(self.labels, key)} {value}"
+            for key, value in self.values.items()
+        ]
+
+
+class Gauge(Counter):
+    """Текущее значение с метками."""
+
+    type = "gauge"
+
+    def set(self, value: float, **labels) -> None:
+        self.values[tuple(labels[name] for name in self.labels)] = value
+
+
+class Histogram:
+    """Гистограмма длительностей в секундах."""
+
+    type = "histogram"
+
+    def __init__(
+        self,
+        name: str,
+        doc: str,
+        labels: tuple[str, ...] = (),
+        buckets: tuple[float, ...] = DEFAULT_BUCKETS
+    ):
+        self.name = name
+        self.doc = doc
+        self.labels = labels
+        self.buckets = buckets
+        # метки -> [счётчики корзин..., +Inf, сумма]
+        self.series: dict[tuple, list[float]] = {}
+
+    def observe(self, value: float, **labels) -> None:
+        key = tuple(labels[name] for name in self.labels)
+        series = self.series.get(key)
+        if series is None:
+            series = self.series[key] = [0] * (len(self.buckets) + 2)
+        series[bisect_left(self.buckets, value)] += 1
+        series[-1] += value
+
+    def summary(self, key: tuple) -> Dict[str, float]:
+        """Количество, среднее и оценка p50/p99 по границам корзин."""
+        series = self.series[key]
+        count = sum(series[:-1])
+        result = {"count": count, "avg": series[-1] / count if count else 0.0}
+        for name, q in (("p50", 0.5), ("p99", 0.99)):
+            seen = 0
+            result[name] = float("inf")
+            for bound, hits in zip(self.buckets, series):
+                seen += hits
+                if seen >= count * q:
+                    result[name] = bound
+                    break
+        return result
+
+    def render(self) -> list[str]:
+        lines = []
+        for key, series in self.series.items():
+            cumulative = 0
+            for bound, hits in zip(self.buckets + (float("inf"),), series):
+                cumulative += hits
+                le = "+Inf" if bound == float("inf") else repr(bound)
+                labels = _format_labels(self.labels, key, f'le="{le}"')
+                lines.append(f"{self.name}_bucket{labels} {cumulative}")
+            lines.append(f"{self.name}_sum{_format_labels(self.labels, key)} {series[-1]}")
+            lines.append(f"{self.name}_count{_format_labels(self.labels, key)} {cumulative}")
+        return lines
+
+
+class LatencyEstimate:
+    """Экспоненциальное скользящее среднее длительности операции."""
+
+    def __init__(self, initial: float, alpha: float = 0.2):
+        self.value = initial
+        self.alpha = alpha
+
+    def observe(self, seconds: float) -> None:
+        self.value += self.alpha * (seconds - self.value)
+
+
+class MetricsRegistry:
+    """Реестр метрик в формате Prometheus.
+
+    При выключенных метриках ``timer`` ничего не замеряет, а остальной
+    код проверяет ``enabled`` перед замером, поэтому инструментирование
+    горячих путей почти бесплатно.
+    """
+
+    def __init__(self, enabled: bool = False):
+        self.enabled = enabled
+        self._metrics: list = []
+        self._collectors: list[Callable[[], None]] = []
+
+        self.command_seconds = self._add(Histogram(
+            "bot_command_seconds", "Полное время выполнения команды", ("command",)
+        ))
+        self.command_phase_seconds = self._add(Histogram(
+            "bot_command_phase_seconds", "Время этапов команды", ("command", "phase")
+        ))
+        self.commands_total = self._add(Counter(
+            "bot_commands_total", "Выполненные команды", ("command", "status")
+        ))
+        self.rate_limited_total = self._add(Counter(
+            "bot_rate_limited_total", "Отклонённые лимитом вызовы", ("command", "scope")
+        ))
+        self.db_query_seconds = self._add(Histogram(
+            "bot_db_query_seconds", "Время запросов DatabaseManager", ("query",)
+        ))
+        self.loop_lag_seconds = self._add(Gauge(
+            "bot_event_loop_lag_seconds", "Задержка цикла событий"
+        ))
+        self.gateway_latency_seconds = self._add(Gauge(
+            "bot_gateway_latency_seconds", "Задержка шлюза Discord (heartbeat)"
+        ))
+        self.process_rss_bytes = self._add(Gauge(
+            "bot_process_rss_bytes", "Резидентная память процесса"
+        ))
+        self.db_pool = self._add(Gauge(
+            "bot_db_pool", "Состояние пула соединений", ("stat",)
+        ))
+        self.db_up = self._add(Gauge(
+            "bot_db_up", "Доступность БД по фоновой проверке (1 — доступна)"
+        ))
+        self.responses_total = self._add(Counter(
+            "bot_interaction_responses_total",
+            "Первые ответы на команды: сразу сообщением или через defer",
+            ("command", "mode")
+        ))
+
+    def _add(self, metric):
+        self._metrics.append(metric)
+        return metric
+
+    def add_collector(self, collector: Callable[[], None]) -> None:
+        """Функция, обновляющая метрики перед выгрузкой."""
+        self._collectors.append(collector)
+
+    def observe_phase(self, phase: str, seconds: float) -> None:
+        """Учёт этапа (db, bcrypt, respond, defer, followup) текущей команды."""
+        command = current_command.get()
+        if command is not None:
+            self.command_phase_seconds.observe(seconds, command=command, phase=phase)
+
+    @contextmanager
+    def timer(self, phase: str):
+        """Замер этапа текущей команды."""
+        if not self.enabled:
+            yield
+            return
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe_phase(phase, time.perf_counter() - start)
+
+    def render(self) -> str:
+        """Текст для эндпоинта /metrics."""
+        for collector in self._collectors:
+            collector()
+        lines = []
+        for metric in self._metrics:
+            lines.append(f"# HELP {metric.name} {metric.doc}")
+            lines.append(f"# TYPE {metric.name} {metric.type}")
+            lines.extend(metric.render())
+        return "\n".join(lines) + "\n"
+
+    def snapshot(self) -> Dict[str, Any]:
+        """Сводка по командам и запросам для /stats."""
+        for collector in self._collectors:
+            collector()
+        return {
+            "commands": {
+                key[0]: self.command_seconds.summary(key)
+                for key in self.command_seconds.series
+            },
+            "phases": {
+                key: self.command_phase_seconds.summary(key)
+                for key in self.command_phase_seconds.series
+            },
+            "queries": {
+                key[0]: self.db_query_seconds.summary(key)
+                for key in self.db_query_seconds.series
+            },
+            "loop_lag": self.loop_lag_seconds.values.get((), 0.0),
+            "gateway_latency": self.gateway_latency_seconds.values.get((), 0.0),
+            "rss": self.process_rss_bytes.values.get((), 0),
+        }
+
+
+metrics = MetricsRegistry(enabled=Config.METRICS_ENABLED)
+
+
+def record_command(interaction: discord.Interaction, status: str) -> None:
+    """Учёт завершённой команды: время от ``interaction_check`` до завершения."""
+    started = interaction.extras.pop("started", None)
+    if started is None:
+        return
+    duration = time.perf_counter() - started
+    command = interaction.command
+    name = command.qualified_name if command else "unknown"
+    if metrics.enabled:
+        metrics.command_seconds.observe(duration, command=name)
+        metrics.commands_total.inc(command=name, status=status)
+    # INFO: поле duration в JSON-логах должно быть видно при уровне по умолчанию
+    logger.info(
+        f"Команда {name} выполнена за {duration * 1000:.1f} мс ({status})",
+        extra={"duration": round(duration, 4)}
+    )
+
+
+class MetricsCommandTree(app_commands.CommandTree):
+    """Дерево команд, выставляющее контекст (команда, пользователь) для логов
+    и замеряющее полное время каждой команды.
+
+    Только публичные точки расширения: начало — ``interaction_check``,
+    конец — событие ``app_command_completion`` или ``on_error``.
+    Автодополнение получает контекст логов, но не замеряется: события
+    о его завершении нет.
+    """
+
+    def __init__(self, client, **kwargs):
+        super().__init__(client, **kwargs)
+        client.add_listener(self.on_app_command_completion)
+
+    async def interaction_check(self, interaction: discord.Interaction) -> bool:
+        command = interaction.command
+        name = command.qualified_name if command else "unknown"
+        if interaction.type is discord.InteractionType.autocomplete:
+            name += ":autocomplete"
+        else:
+            interaction.extras["started"] = time.perf_counter()
+        # У каждого взаимодействия своя задача вызова: сбрасывать контекст не нужно
+        current_command.set(name)
+        current_user.set(interaction.user.id)
+        return True
+
+    async def on_app_command_completion(self, interaction: discord.Interaction, command) -> None:
+        record_command(interaction, "ok")
+
+    async def on_error(self, interaction: discord.Interaction, error: app_commands.AppCommandError) -> None:
+        # Импорт здесь: utils.ratelimit сам зависит от метрик
+        from utils.ratelimit import RateLimited
+        from utils.circuit import CircuitOpenError
+        if isinstance(error, (RateLimited, CircuitOpenError)):
+            if isinstance(error, RateLimited):
+                message = f"⏳ Слишком часто, повторите через {error.retry_after:.0f} с"
+            else:
+                message = f"🚨 {error.name} временно недоступна, повторите через {error.retry_after:.0f} с"
+            try:
+                if interaction.response.is_done():
+                    await interaction.followup.send(message, ephemeral=True)
+                else:
+                    await interaction.response.send_message(message, ephemeral=True)
+            finally:
+                record_command(interaction, "error")
+            return
+        try:
+            await super().on_error(interaction, error)
+        finally:
+            record_command(interaction, "error")
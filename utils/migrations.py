@@ -0,0 +1,97 @@
+import logging
+from typing import Callable
+from utils.storage import StorageBackend
+
+logger = logging.getLogger("discord_bot")
+
+# Таблица users в диалекте каждого бэкенда
+USERS_TABLE = {
+    "mariadb": """
+        CREATE TABLE IF NOT EXISTS users (
+            uuid CHAR(36) NOT NULL DEFAULT UUID(),
+            username VARCHAR(32) NOT NULL,
+            password VARCHAR(255) NOT NULL,
+            discord_id BIGINT UNSIGNED NOT NULL,
+            serverID VARCHAR(64),
+            accessToken VARCHAR(64),
+            UNIQUE KEY users_username_uq (username),
+            UNIQUE KEY users_discord_id_uq (discord_id)
+        ) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_general_ci
+    """,
+    "sqlite": """
+        CREATE TABLE IF NOT EXISTS users (
+            uuid TEXT NOT NULL DEFAULT (lower(
+                hex(randomblob(4)) || '-' || hex(randomblob(2)) || '-4' ||
+                substr(hex(randomblob(2)), 2) || '-' ||
+                substr('89ab', 1 + (abs(random()) % 4), 1) ||
+                substr(hex(randomblob(2)), 2) || '-' || hex(randomblob(6))
+            )),
+            username TEXT NOT NULL COLLATE NOCASE,
+            password TEXT NOT NULL,
+            discord_id INTEGER NOT NULL,
+            serverID TEXT,
+            accessToken TEXT,
+            CONSTRAINT users_username_uq UNIQUE (username),
+            CONSTRAINT users_discord_id_uq UNIQUE (discord_id)
+        )
+    """,
+}
+
+# Столбцы, по которым идут все выборки: без уникального индекса — полный проход
+UNIQUE_COLUMNS = ("username", "discord_id")
+
+
+def _create_users(cursor, storage: StorageBackend) -> None:
+    cursor.execute(USERS_TABLE[storage.name])
+
+
+def _add_unique_indexes(cursor, storage: StorageBackend) -> None:
+    """Индексы для таблиц, созданных до появления миграций."""
+    existing = storage.unique_columns(cursor, "users")
+    for column in UNIQUE_COLUMNS:
+        if column not in existing:
+            logger.info(f"Создание уникального индекса users.{column}")
+            cursor.execute(f"CREATE UNIQUE INDEX users_{column}_uq ON users ({column})")
+
+
+# (версия, описание, функция); применяются по возрастанию версии
+MIGRATIONS: list[tuple[int, str, Callable]] = [
+    (1, "Таблица users", _create_users),
+    (2, "Уникальные индексы username и discord_id", _add_unique_indexes),
+]
+
+
+def migrate(cursor, storage: StorageBackend) -> list[int]:
+    """Применение ещё не применённых миграций. Возвращает их версии."""
+    cursor.execute(
+        """CREATE TABLE IF NOT EXISTS schema_migrations (
+            version INTEGER NOT NULL PRIMARY KEY,
+            description VARCHAR(255) NOT NULL,
+            applied_at TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP
+        )"""
+    )
+    cursor.execute("SELECT version FROM schema_migrations")
+    done = {row[0] for row in cursor.fetchall()}
+
+    applied = []
+    for version, description, apply in MIGRATIONS:
+        if version in done:
+            continue
+        apply(cursor, storage)
+        cursor.execute(
+            "INSERT INTO schema_migrations (version, description) VALUES (?, ?)",
+            (version, description)
+        )
+        logger.info(f"Миграция {version} применена: {description}")
+        applied.append(version)
+    return applied
+
+
+def verify(cursor, storage: StorageBackend) -> list[str]:
+    """Проверка схемы: список найденных проблем."""
+    existing = storage.unique_columns(cursor, "users")
+    return [
+        f"Нет уникального индекса по users.{column}: выборки будут полным проходом"
+        for column in UNIQUE_COLUMNS
+        if column not in existing
+    ]
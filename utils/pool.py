@@ -0,0 +1,209 @@
+import time
+import logging
+import threading
+from collections import deque
+from contextlib import contextmanager
+from typing import Dict, Any
+import mariadb
+
+logger = logging.getLogger("discord_bot")
+
+
+class PoolTimeoutError(mariadb.Error):
+    """Не удалось получить соединение из пула за отведённое время."""
+
+
+class _PooledConnection:
+    """Соединение пула с метками времени создания и последнего использования."""
+
+    __slots__ = ("conn", "created_at", "last_used")
+
+    def __init__(self, conn):
+        self.conn = conn
+        self.created_at = time.monotonic()
+        self.last_used = self.created_at
+
+
+class ConnectionPool:
+    """Потокобезопасный пул соединений MariaDB.
+
+    Держит не более ``max_size`` соединений, прогревает ``min_idle`` штук,
+    проверяет простаивавшие соединения через ``ping()`` при выдаче
+    и пересоздаёт соединения старше ``max_lifetime`` секунд.
+    """
+
+    def __init__(
+        self,
+        config: Dict[str, Any],
+        max_size: int = 10,
+        min_idle: int = 2,
+        max_lifetime: float = 1800,
+        timeout: float = 5,
+        ping_interval: float = 30
+    ):
+        self.config = config
+        self.max_size = max(1, max_size)
+        self.min_idle = max(0, min(min_idle, self.max_size))
+        self.max_lifetime = max_lifetime
+        self.timeout = timeout
+        self.ping_interval = ping_interval
+
+        self._idle: deque[_PooledConnection] = deque()
+        self._size = 0
+        self._waiters = 0
+        self._cond = threading.Condition()
+
+        # Статистика
+        self._checkouts = 0
+        self._timeouts = 0
+        self._created = 0
+        self._recycled = 0
+        self._checkout_time_total = 0.0
+        self._checkout_time_max = 0.0
+
+    def _open(self) -> _PooledConnection:
+        conn = mariadb.connect(**self.config)
+        with self._cond:
+            self._created += 1
+        return _PooledConnection(conn)
+
+    def _discard(self, item: _PooledConnection, recycled: bool = False) -> None:
+        """Закрытие соединения и освобождение места в пуле."""
+        try:
+            item.conn.close()
+        except mariadb.Error:
+            pass
+        with self._cond:
+            self._size -= 1
+            if recycled:
+                self._recycled += 1
+            self._cond.notify()
+
+    def _is_expired(self, item: _PooledConnection, now: float) -> bool:
+        return self.max_lifetime > 0 and now - item.created_at >= self.max_lifetime
+
+    def _is_healthy(self, item: _PooledConnection, now: float) -> bool:
+        if now - item.last_used < self.ping_interval:
+            return True
+        try:
+            item.conn.ping()
+            return True
+        except mariadb.Error:
+            return False
+
+    def fill(self) -> None:
+        """Прогрев пула до ``min_idle`` свободных соединений."""
+        while True:
+            with self._cond:
+                if len(self._idle) >= self.min_idle or self._size >= self.max_size:
+                    return
+                self._size += 1
+            try:
+                item = self._open()
+            except mariadb.Error as e:
+                with self._cond:
+                    self._size -= 1
+                logger.error(f"Не удалось прогреть пул БД: {str(e)}")
+                return
+            with self._cond:
+                self._idle.append(item)
+                self._cond.notify()
+
+    def acquire(self) -> _PooledConnection:
+        """Получение соединения из пула (блокирует поток до ``timeout``)."""
+        start = time.monotonic()
+        deadline = start + self.timeout
+        while True:
+            item = None
+            with self._cond:
+                self._waiters += 1
+                try:
+                    while not self._idle and self._size >= self.max_size:
+                        remaining = deadline - time.monotonic()
+                        if remaining <= 0:
+                            self._timeouts += 1
+                            raise PoolTimeoutError(
+                                f"Пул БД исчерпан ({self.max_size} соединений занято)"
+                            )
+                        self._cond.wait(remaining)
+                finally:
+                    self._waiters -= 1
+
+                if self._idle:
+                    item = self._idle.pop()
+                else:
+                    self._size += 1
+
+            if item is None:
+                try:
+                    item = self._open()
+                except mariadb.Error:
+                    with self._cond:
+                        self._size -= 1
+                        self._cond.notify()
+                    raise
+            else:
+                now = time.monotonic()
+                if self._is_expired(item, now) or not self._is_healthy(item, now):
+                    self._discard(item, recycled=True)
+                    continue
+
+            elapsed = time.monotonic() - start
+            with self._cond:
+                self._checkouts += 1
+                self._checkout_time_total += elapsed
+                self._checkout_time_max = max(self._checkout_time_max, elapsed)
+            return item
+
+    def release(self, item: _PooledConnection, broken: bool = False) -> None:
+        """Возврат соединения в пул."""
+        now = time.monotonic()
+        if broken or self._is_expired(item, now):
+            self._discard(item, recycled=True)
+            return
+        item.last_used = now
+        with self._cond:
+            self._idle.append(item)
+            self._cond.notify()
+
+    @contextmanager
+    def connection(self):
+        """Контекстный менеджер для соединения из пула."""
+        item = self.acquire()
+        broken = False
+        try:
+            yield item.conn
+        except (mariadb.InterfaceError, mariadb.OperationalError):
+            broken = True
+            raise
+        finally:
+            self.release(item, broken=broken)
+
+    def close(self) -> None:
+        """Закрытие всех свободных соединений."""
+        with self._cond:
+            items = list(self._idle)
+            self._idle.clear()
+        for item in items:
+            self._discard(item)
+
+    def stats(self) -> Dict[str, Any]:
+        """Статистика пула для мониторинга."""
+        with self._cond:
+            idle = len(self._idle)
+            checkouts = self._checkouts
+            return {
+                "size": self._size,
+                "max_size": self.max_size,
+                "in_use": self._size - idle,
+                "idle": idle,
+                "waiters": self._waiters,
+                "checkouts": checkouts,
+                "timeouts": self._timeouts,
+                "created": self._created,
+                "recycled": self._recycled,
+                "checkout_avg_ms": (
+                    self._checkout_time_total / checkouts * 1000 if checkouts else 0.0
+                ),
+                "checkout_max_ms": self._checkout_time_max * 1000,
+            }
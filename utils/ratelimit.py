@@ -0,0 +1,103 @@
+import time
+from typing import Hashable
+import discord
+from discord import app_commands
+from config import Config
+from utils.metrics import metrics
+
+
+class RateLimited(app_commands.CheckFailure):
+    """Команда отклонена ограничителем частоты."""
+
+    def __init__(self, scope: str, retry_after: float):
+        self.scope = scope
+        self.retry_after = retry_after
+        super().__init__(f"Лимит {scope}, повтор через {retry_after:.1f} с")
+
+
+def parse_rate(value: str) -> tuple[int, float]:
+    """Разбор лимита вида "<запросов>/<секунд>"."""
+    count, _, per = value.partition("/")
+    return int(count), float(per or 60)
+
+
+class RateLimiter:
+    """Token bucket по произвольному ключу.
+
+    Проверка и списание — O(1); корзины, простаивавшие дольше
+    ``idle_ttl`` (по умолчанию — время полного восполнения, после него
+    корзина всё равно полная), удаляются проходом не чаще раза в ``idle_ttl``.
+    """
+
+    def __init__(self, capacity: int, per: float, idle_ttl: float | None = None):
+        self.capacity = max(1, capacity)
+        self.rate = self.capacity / per  # токенов в секунду
+        self.idle_ttl = per if idle_ttl is None else idle_ttl
+        self._buckets: dict[Hashable, list[float]] = {}  # ключ -> [токены, время]
+        self._last_evict = time.monotonic()
+
+    def _refill(self, key: Hashable, now: float) -> list[float]:
+        bucket = self._buckets.get(key)
+        if bucket is None:
+            bucket = self._buckets[key] = [float(self.capacity), now]
+        else:
+            bucket[0] = min(self.capacity, bucket[0] + (now - bucket[1]) * self.rate)
+            bucket[1] = now
+        return bucket
+
+    def retry_after(self, key: Hashable) -> float:
+        """Сколько секунд ждать до следующего токена (0 — можно сейчас)."""
+        now = time.monotonic()
+        if now - self._last_evict > self.idle_ttl:
+            self.evict(now)
+        tokens = self._refill(key, now)[0]
+        return 0.0 if tokens >= 1 else (1 - tokens) / self.rate
+
+    def consume(self, key: Hashable) -> None:
+        """Списание токена (после успешной проверки)."""
+        self._buckets[key][0] -= 1
+
+    def evict(self, now: float | None = None) -> int:
+        """Удаление простаивающих корзин."""
+        now = time.monotonic() if now is None else now
+        self._last_evict = now
+        idle = [key for key, (_, updated) in self._buckets.items() if now - updated > self.idle_ttl]
+        for key in idle:
+            del self._buckets[key]
+        return len(idle)
+
+    def __len__(self) -> int:
+        return len(self._buckets)
+
+
+def rate_limit(command: str):
+    """Проверка app-команды лимитами на пользователя, сервер и глобально.
+
+    Проверки выполняются снизу вверх: декоратор ставится выше
+    ``has_permissions``, чтобы лимиты тратили только прошедшие проверку прав.
+    """
+    limiters = [
+        ("user", RateLimiter(*parse_rate(Config.RATE_LIMITS.get(command, Config.RATE_LIMIT_USER)))),
+        ("guild", RateLimiter(*parse_rate(Config.RATE_LIMIT_GUILD))),
+        ("global", RateLimiter(*parse_rate(Config.RATE_LIMIT_GLOBAL))),
+    ]
+
+    async def predicate(interaction: discord.Interaction) -> bool:
+        keys = {
+            "user": interaction.user.id,
+            "guild": interaction.guild_id or 0,
+            "global": None,
+        }
+        # Сначала проверка всех уровней, затем списание, чтобы отказ
+        # на одном уровне не тратил токены на других
+        for scope, limiter in limiters:
+            retry_after = limiter.retry_after(keys[scope])
+            if retry_after:
+                if metrics.enabled:
+                    metrics.rate_limited_total.inc(command=command, scope=scope)
+                raise RateLimited(scope, retry_after)
+        for scope, limiter in limiters:
+            limiter.consume(keys[scope])
+        return True
+
+    return app_commands.check(predicate)
@@ -0,0 +1,169 @@
+import io
+import os
+import struct
+import asyncio
+import hashlib
+import aiohttp
+import discord
+from concurrent.futures import ThreadPoolExecutor
+from cachetools import LRUCache
+from config import Config
+
+PNG_SIGNATURE = b"\x89PNG\r\n\x1a\n"
+# Сигнатура (8) + длина (4) + "IHDR" (4) + ширина и высота (8)
+HEADER_SIZE = 24
+SKIN_SIZES = {(64, 64), (64, 32)}
+
+# Лицевые стороны головы и туловища базового слоя должны быть непрозрачны
+# (координаты одинаковы в 64x64 и в старом формате 64x32)
+OPAQUE_REGIONS = [(8, 8, 16, 16), (20, 20, 28, 32)]
+
+
+def _load_pil():
+    """Ленивый импорт Pillow: нужен только при проверке скина."""
+    from PIL import Image, PngImagePlugin
+    # Защита от бомб в сжатых текстовых чанках (zTXt/iTXt/iCCP)
+    PngImagePlugin.MAX_TEXT_CHUNK = 64 * 1024
+    PngImagePlugin.MAX_TEXT_MEMORY = 256 * 1024
+    return Image
+
+
+def parse_png_header(head: bytes) -> tuple[int, int] | None:
+    """Размеры изображения из IHDR или None, если это не PNG."""
+    if len(head) < HEADER_SIZE or not head.startswith(PNG_SIGNATURE):
+        return None
+    length, chunk_type = struct.unpack(">I4s", head[8:16])
+    if length != 13 or chunk_type != b"IHDR":
+        return None
+    return struct.unpack(">II", head[16:24])
+
+
+def check_skin(data: bytes) -> str | None:
+    """Полное декодирование и проверка скина (выполняется в пуле потоков)."""
+    Image = _load_pil()
+    try:
+        with Image.open(io.BytesIO(data), formats=["PNG"]) as img:
+            # Размер проверяется до декодирования пикселей
+            if img.size not in SKIN_SIZES:
+                return "❌ Неверный размер (требуется 64x64 или 64x32)"
+            img.load()
+            rgba = img.convert("RGBA")
+    except Image.DecompressionBombError:
+        return "❌ Изображение отклонено (подозрение на zip-бомбу)"
+    except Exception:
+        return "❌ Некорректный файл изображения"
+
+    alpha = rgba.getchannel("A")
+    if alpha.getextrema()[1] == 0:
+        return "❌ Скин полностью прозрачный"
+    for region in OPAQUE_REGIONS:
+        if alpha.crop(region).getextrema()[0] < 255:
+            return "❌ Базовый слой головы и туловища должен быть непрозрачным"
+    return None
+
+
+class SkinValidator:
+    """Проверка скинов: заголовок PNG до загрузки файла целиком,
+    декодирование в пуле потоков и кеш результатов по SHA-256."""
+
+    def __init__(self, max_size: int = 256 * 1024, cache_size: int = 1024, workers: int = 2):
+        self.max_size = max_size
+        self._results = LRUCache(maxsize=cache_size)
+        self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="skin")
+        self._session: aiohttp.ClientSession | None = None
+
+    async def _get_session(self) -> aiohttp.ClientSession:
+        if self._session is None or self._session.closed:
+            self._session = aiohttp.ClientSession(timeout=aiohttp.ClientTimeout(total=15))
+        return self._session
+
+    async def _download(self, file: discord.Attachment) -> tuple[str | None, bytes | None]:
+        """Потоковая загрузка с проверкой заголовка по первым байтам."""
+        session = await self._get_session()
+        async with session.get(file.url) as response:
+            if response.status != 200:
+                return "❌ Не удалось загрузить файл", None
+            try:
+                head = await response.content.readexactly(HEADER_SIZE)
+            except asyncio.IncompleteReadError:
+                return "❌ Это не PNG файл", None
+
+            size = parse_png_header(head)
+            if size is None:
+                return "❌ Это не PNG файл", None
+            if size not in SKIN_SIZES:
+                return "❌ Неверный размер (требуется 64x64 или 64x32)", None
+
+            data = bytearray(head)
+            async for chunk in response.content.iter_chunked(16 * 1024):
+                data += chunk
+                if len(data) > self.max_size:
+                    return f"❌ Файл слишком большой (макс. {self.max_size // 1024}KB)", None
+            return None, bytes(data)
+
+    def precheck(self, file: discord.Attachment) -> str | None:
+        """Проверка по метаданным вложения, без скачивания."""
+        if file.size > self.max_size:
+            return f"❌ Файл слишком большой (макс. {self.max_size // 1024}KB)"
+        if not file.filename.lower().endswith(".png"):
+            return "❌ Только PNG файлы разрешены"
+        return None
+
+    async def validate(self, file: discord.Attachment) -> tuple[str | None, bytes | None]:
+        """Проверка вложения: (ошибка, содержимое PNG)."""
+        if error := self.precheck(file):
+            return error, None
+
+        error, data = await self._download(file)
+        if error:
+            return error, None
+
+        digest = hashlib.sha256(data).hexdigest()
+        if digest in self._results:
+            error = self._results[digest]
+        else:
+            loop = asyncio.get_running_loop()
+            error = await loop.run_in_executor(self._executor, check_skin, data)
+            self._results[digest] = error
+        return error, None if error else data
+
+    async def store(self, username: str, data: bytes) -> str:
+        """Сохранение скина для лаунчера как <SKINS_DIR>/<логин>.png."""
+        path = skin_path(username)
+        loop = asyncio.get_running_loop()
+        await loop.run_in_executor(self._executor, _write_atomic, path, data)
+        return path
+
+    async def close(self) -> None:
+        if self._session is not None:
+            await self._session.close()
+
+
+def skin_path(username: str) -> str:
+    """Путь к файлу скина; ValueError, если логин выводит за пределы SKINS_DIR.
+
+    Логин берётся из БД: шаблон настраивается, а старые записи могут быть любыми.
+    """
+    separators = {os.sep, os.altsep, "\0"} - {None}
+    if username in ("", ".", "..") or any(sep in username for sep in separators):
+        raise ValueError("Логин не подходит для имени файла скина")
+    root = os.path.realpath(Config.SKINS_DIR)
+    path = os.path.realpath(os.path.join(root, f"{username}.png"))
+    if os.path.dirname(path) != root:
+        raise ValueError("Логин не подходит для имени файла скина")
+    return path
+
+
+def _write_atomic(path: str, data: bytes) -> None:
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, "wb") as f:
+        f.write(data)
+    os.replace(tmp_path, path)
+
+
+skin_validator = SkinValidator(
+    max_size=Config.SKIN_MAX_SIZE,
+    cache_size=Config.SKIN_CACHE_SIZE,
+    workers=Config.SKIN_WORKERS
+)
@@ -0,0 +1,321 @@
+import time
+import sqlite3
+import threading
+from collections import deque
+from contextlib import contextmanager
+from functools import lru_cache
+from typing import Dict, Any
+from config import Config
+
+
+class StorageBackend:
+    """Хранилище пользователей: выдаёт соединения с DB-API курсорами.
+
+    Запросы пишутся в диалекте MariaDB с плейсхолдерами ``?``;
+    бэкенд сам приводит их к своему диалекту.
+    """
+
+    name = "base"
+    # Исключения драйвера, которые логируются как ошибки БД
+    errors: tuple[type[BaseException], ...] = ()
+    # Из них — признаки недоступности БД (учитываются автоматом размыкания)
+    connection_errors: tuple[type[BaseException], ...] = ()
+    # Из них — отказ из-за самих данных (повтор того же запроса не поможет)
+    data_errors: tuple[type[BaseException], ...] = ()
+
+    def connection(self):
+        """Контекстный менеджер соединения."""
+        raise NotImplementedError
+
+    def fill(self) -> None:
+        """Подготовка соединений заранее."""
+
+    def close(self) -> None:
+        """Закрытие всех свободных соединений."""
+
+    def stats(self) -> Dict[str, Any]:
+        return {}
+
+    def unique_columns(self, cursor, table: str) -> set[str]:
+        """Столбцы таблицы с одностолбцовым уникальным индексом."""
+        raise NotImplementedError
+
+    def explain(self, cursor, query: str, params=()) -> tuple[list[str], bool]:
+        """План запроса и признак полного прохода по таблице."""
+        raise NotImplementedError
+
+
+class MariaDBBackend(StorageBackend):
+    """MariaDB через общий пул соединений."""
+
+    name = "mariadb"
+
+    def __init__(self, config: Dict[str, Any]):
+        import mariadb
+        from utils.pool import ConnectionPool, PoolTimeoutError
+
+        self.errors = (mariadb.Error,)
+        self.connection_errors = (mariadb.InterfaceError, mariadb.OperationalError, PoolTimeoutError)
+        self.data_errors = (mariadb.IntegrityError, mariadb.DataError)
+        self.pool = ConnectionPool(
+            config,
+            max_size=Config.DB_POOL_SIZE,
+            min_idle=Config.DB_POOL_MIN_IDLE,
+            max_lifetime=Config.DB_POOL_MAX_LIFETIME,
+            timeout=Config.DB_POOL_TIMEOUT,
+            ping_interval=Config.DB_POOL_PING_INTERVAL
+        )
+
+    def connection(self):
+        return self.pool.connection()
+
+    def fill(self) -> None:
+        self.pool.fill()
+
+    def close(self) -> None:
+        self.pool.close()
+
+    def stats(self) -> Dict[str, Any]:
+        return self.pool.stats()
+
+    def unique_columns(self, cursor, table: str) -> set[str]:
+        cursor.execute(
+            """SELECT INDEX_NAME, COLUMN_NAME FROM information_schema.STATISTICS
+            WHERE TABLE_SCHEMA = DATABASE() AND TABLE_NAME = ? AND NON_UNIQUE = 0""",
+            (table,)
+        )
+        indexes: Dict[str, list[str]] = {}
+        for index, column in cursor.fetchall():
+            indexes.setdefault(index, []).append(column)
+        return {columns[0] for columns in indexes.values() if len(columns) == 1}
+
+    def explain(self, cursor, query: str, params=()) -> tuple[list[str], bool]:
+        cursor.execute(f"EXPLAIN {query}", params)
+        names = [column[0] for column in cursor.description]
+        rows = [dict(zip(names, row)) for row in cursor.fetchall()]
+        plan = [
+            f"{row['table']}: type={row['type']} key={row['key']} rows={row['rows']}"
+            + (f" ({row['Extra']})" if row.get("Extra") else "")
+            for row in rows
+        ]
+        # ALL — проход по таблице, index — по всему индексу; строка
+        # UNION RESULT описывает временную таблицу объединения
+        full_scan = any(
+            row["type"] in ("ALL", "index") and row["select_type"] != "UNION RESULT"
+            for row in rows
+        )
+        return plan, full_scan
+
+
+class SQLiteUnavailableError(sqlite3.OperationalError):
+    """База SQLite временно недоступна: занята, не открывается или ошибка ввода-вывода."""
+
+
+# Первичные коды ошибок SQLite, после которых запрос можно повторить позже;
+# остальные OperationalError (синтаксис, нет таблицы) — ошибки самого запроса
+_SQLITE_TRANSIENT = {
+    sqlite3.SQLITE_BUSY,
+    sqlite3.SQLITE_LOCKED,
+    sqlite3.SQLITE_IOERR,
+    sqlite3.SQLITE_CANTOPEN,
+    sqlite3.SQLITE_PROTOCOL,
+}
+
+
+def _is_transient(error: sqlite3.OperationalError) -> bool:
+    code = getattr(error, "sqlite_errorcode", None)
+    return code is not None and code & 0xFF in _SQLITE_TRANSIENT
+
+
+@lru_cache(maxsize=256)
+def _to_sqlite(query: str) -> str:
+    """Перевод запроса из диалекта MariaDB (результат кешируется)."""
+    # В MariaDB '\\' — один обратный слеш, в SQLite обратный слеш не экранируется
+    return query.replace("INSERT IGNORE", "INSERT OR IGNORE").replace("ESCAPE '\\\\'", "ESCAPE '\\'")
+
+
+class _SQLiteCursor:
+    """Курсор sqlite3, принимающий запросы в диалекте MariaDB."""
+
+    __slots__ = ("_cursor",)
+
+    def __init__(self, cursor: sqlite3.Cursor):
+        self._cursor = cursor
+
+    def execute(self, query: str, params=()):
+        return self._cursor.execute(_to_sqlite(query), params)
+
+    def executemany(self, query: str, rows):
+        return self._cursor.executemany(_to_sqlite(query), rows)
+
+    def __getattr__(self, name: str):
+        return getattr(self._cursor, name)
+
+
+class _SQLiteConnection:
+    __slots__ = ("conn",)
+
+    def __init__(self, conn: sqlite3.Connection):
+        self.conn = conn
+
+    def cursor(self, **options) -> _SQLiteCursor:
+        # Параметры курсора MariaDB (buffered и т.п.) для SQLite не нужны
+        return _SQLiteCursor(self.conn.cursor())
+
+    def commit(self):
+        self.conn.commit()
+
+    def rollback(self):
+        self.conn.rollback()
+
+    def close(self):
+        self.conn.close()
+
+
+class SQLiteBackend(StorageBackend):
+    """Встроенная SQLite в режиме WAL.
+
+    Соединения открываются заранее и выдаются потокам по одному:
+    читатели не блокируют писателя, а подготовленные запросы
+    кешируются в каждом соединении (``cached_statements``).
+    """
+
+    name = "sqlite"
+    errors = (sqlite3.Error,)
+    connection_errors = (SQLiteUnavailableError,)
+    data_errors = (sqlite3.IntegrityError, sqlite3.DataError)
+
+    def __init__(
+        self,
+        path: str,
+        size: int = 4,
+        timeout: float = 5,
+        cached_statements: int = 256
+    ):
+        self.path = path
+        self.size = max(1, size)
+        self.timeout = timeout
+        self.cached_statements = cached_statements
+        self._idle: deque[_SQLiteConnection] = deque()
+        self._created = 0
+        self._cond = threading.Condition()
+
+        # Статистика
+        self._waiters = 0
+        self._checkouts = 0
+        self._timeouts = 0
+        self._checkout_time_total = 0.0
+        self._checkout_time_max = 0.0
+
+        self._idle.append(self._open())
+
+    def _open(self) -> _SQLiteConnection:
+        conn = sqlite3.connect(
+            self.path,
+            timeout=self.timeout,
+            check_same_thread=False,  # соединение используется одним потоком за раз
+            cached_statements=self.cached_statements
+        )
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=NORMAL")
+        conn.execute("PRAGMA foreign_keys=ON")
+        self._created += 1
+        return _SQLiteConnection(conn)
+
+    def fill(self) -> None:
+        with self._cond:
+            while self._created < self.size:
+                self._idle.append(self._open())
+
+    @contextmanager
+    def connection(self):
+        start = time.monotonic()
+        with self._cond:
+            self._waiters += 1
+            try:
+                while not self._idle and self._created >= self.size:
+                    remaining = start + self.timeout - time.monotonic()
+                    if remaining <= 0:
+                        self._timeouts += 1
+                        raise SQLiteUnavailableError(
+                            f"Пул SQLite исчерпан ({self.size} соединений занято)"
+                        )
+                    self._cond.wait(remaining)
+            finally:
+                self._waiters -= 1
+            try:
+                conn = self._idle.pop() if self._idle else self._open()
+            except sqlite3.OperationalError as e:
+                raise SQLiteUnavailableError(str(e)) from e
+            elapsed = time.monotonic() - start
+            self._checkouts += 1
+            self._checkout_time_total += elapsed
+            self._checkout_time_max = max(self._checkout_time_max, elapsed)
+        try:
+            yield conn
+        except sqlite3.OperationalError as e:
+            if _is_transient(e) and not isinstance(e, SQLiteUnavailableError):
+                raise SQLiteUnavailableError(str(e)) from e
+            raise
+        finally:
+            with self._cond:
+                self._idle.append(conn)
+                self._cond.notify()
+
+    def unique_columns(self, cursor, table: str) -> set[str]:
+        cursor.execute(f'PRAGMA index_list("{table}")')
+        indexes = [row[1] for row in cursor.fetchall() if row[2]]
+        columns = set()
+        for index in indexes:
+            cursor.execute(f'PRAGMA index_info("{index}")')
+            info = cursor.fetchall()
+            if len(info) == 1:
+                columns.add(info[0][2])
+        return columns
+
+    def explain(self, cursor, query: str, params=()) -> tuple[list[str], bool]:
+        cursor.execute(f"EXPLAIN QUERY PLAN {query}", params)
+        plan = [row[3] for row in cursor.fetchall()]
+        # SEARCH — поиск по индексу, SCAN — проход по таблице или индексу целиком
+        full_scan = any(
+            detail.startswith("SCAN") and detail != "SCAN CONSTANT ROW" for detail in plan
+        )
+        return plan, full_scan
+
+    def close(self) -> None:
+        with self._cond:
+            while self._idle:
+                self._idle.pop().close()
+                self._created -= 1
+
+    def stats(self) -> Dict[str, Any]:
+        with self._cond:
+            idle = len(self._idle)
+            checkouts = self._checkouts
+            return {
+                "size": self._created,
+                "max_size": self.size,
+                "in_use": self._created - idle,
+                "idle": idle,
+                "waiters": self._waiters,
+                "checkouts": checkouts,
+                "timeouts": self._timeouts,
+                "created": self._created,
+                "recycled": 0,
+                "checkout_avg_ms": (
+                    self._checkout_time_total / checkouts * 1000 if checkouts else 0.0
+                ),
+                "checkout_max_ms": self._checkout_time_max * 1000,
+            }
+
+
+def create_backend() -> StorageBackend:
+    """Бэкенд хранилища по ``Config.DB_BACKEND``."""
+    if Config.DB_BACKEND == "sqlite":
+        return SQLiteBackend(
+            Config.SQLITE_PATH,
+            size=Config.DB_POOL_SIZE,
+            timeout=Config.DB_POOL_TIMEOUT,
+            cached_statements=Config.SQLITE_CACHED_STATEMENTS
+        )
+    return MariaDBBackend(Config.DB_CONFIG)
@@ -0,0 +1,236 @@
+"""Проверка логинов и паролей по настраиваемой политике.
+
+Шаблоны компилируются и сообщения об ошибках формируются один раз
+при создании политики; проверка выполняет только проходы на уровне C
+(``fullmatch``/``finditer``) и выходит на первом нарушении.
+
+Фильтр Блума утёкших паролей собирается из списка паролей или SHA-1
+(формат HIBP ``HASH:count``):
+    python -m utils.validation passwords.txt breached.bloom --error-rate 0.001
+"""
+import os
+import re
+import mmap
+import math
+import struct
+import hashlib
+import logging
+from typing import Iterable, Optional
+from config import Config
+
+logger = logging.getLogger("discord_bot")
+
+# Классы символов, которые можно потребовать в пароле
+PASSWORD_CLASSES = {
+    "upper": (r"[A-ZА-ЯЁ]", "хотя бы одну заглавную букву"),
+    "lower": (r"[a-zа-яё]", "хотя бы одну строчную букву"),
+    "digit": (r"\d", "хотя бы одну цифру"),
+    "special": (r"[^\w\s]|_", "хотя бы один спецсимвол"),
+}
+
+DEFAULT_USERNAME_PATTERN = r"[A-Za-z0-9_]+"
+
+# bcrypt учитывает только первые 72 байта пароля
+BCRYPT_MAX_BYTES = 72
+
+_SHA1_LINE = re.compile(r"([0-9A-Fa-f]{40})(?::\d+)?")
+
+
+class BloomFilter:
+    """Фильтр Блума по SHA-1 паролей в файле, отображённом через mmap.
+
+    Формат: ``b"BLM1"``, число хешей k (uint32), число бит m (uint64),
+    затем битовый массив. Страницы подгружаются ОС по мере обращения,
+    поэтому даже большой фильтр не читается в память при старте.
+    """
+
+    MAGIC = b"BLM1"
+    HEADER = struct.Struct("<4sIQ")
+
+    def __init__(self, path: str):
+        with open(path, "rb") as f:
+            self._mmap = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        magic, self.hashes, self.bits = self.HEADER.unpack_from(self._mmap)
+        if magic != self.MAGIC or len(self._mmap) < self.HEADER.size + (self.bits + 7) // 8:
+            self._mmap.close()
+            raise ValueError(f"{path}: не файл фильтра Блума")
+
+    @staticmethod
+    def _positions(digest: bytes, hashes: int, bits: int):
+        # Двойное хеширование: позиции h1 + i*h2 из одного SHA-1
+        h1, h2 = struct.unpack_from("<QQ", digest)
+        for i in range(hashes):
+            yield (h1 + i * h2) % bits
+
+    def __contains__(self, password: str) -> bool:
+        return self.contains_digest(hashlib.sha1(password.encode()).digest())
+
+    def contains_digest(self, digest: bytes) -> bool:
+        # Те же позиции, что в _positions, без генератора на горячем пути
+        h1, h2 = struct.unpack_from("<QQ", digest)
+        offset, bits, data = self.HEADER.size, self.bits, self._mmap
+        for i in range(self.hashes):
+            position = (h1 + i * h2) % bits
+            if not data[offset + (position >> 3)] & (1 << (position & 7)):
+                return False
+        return True
+
+    def close(self) -> None:
+        self._mmap.close()
+
+    @classmethod
+    def build(cls, digests: Iterable[bytes], count: int, path: str, error_rate: float = 0.001) -> None:
+        """Запись фильтра на ``count`` элементов с заданной долей ложных срабатываний."""
+        count = max(1, count)
+        bits = max(8, math.ceil(-count * math.log(error_rate) / math.log(2) ** 2))
+        hashes = max(1, round(bits / count * math.log(2)))
+        array = bytearray((bits + 7) // 8)
+        for digest in digests:
+            for position in cls._positions(digest, hashes, bits):
+                array[position >> 3] |= 1 << (position & 7)
+        tmp_path = f"{path}.tmp"
+        with open(tmp_path, "wb") as f:
+            f.write(cls.HEADER.pack(cls.MAGIC, hashes, bits))
+            f.write(array)
+        os.replace(tmp_path, path)
+
+
+def _line_digest(line: str) -> Optional[bytes]:
+    """SHA-1 строки списка: готовый хеш HIBP или пароль открытым текстом."""
+    line = line.rstrip("\r\n")
+    if not line:
+        return None
+    if match := _SHA1_LINE.fullmatch(line):
+        return bytes.fromhex(match.group(1))
+    return hashlib.sha1(line.encode()).digest()
+
+
+class ValidationPolicy:
+    """Правила для логинов и паролей."""
+
+    def __init__(
+        self,
+        username_min: int = 3,
+        username_max: int = 16,
+        username_pattern: str = DEFAULT_USERNAME_PATTERN,
+        password_min: int = 8,
+        password_require: Iterable[str] = ("upper", "digit"),
+        blocked_names: Iterable[str] = (),
+        breached: BloomFilter | None = None
+    ):
+        self.username_min = username_min
+        self.username_max = username_max
+        try:
+            self._username = re.compile(username_pattern)
+        except re.error as e:
+            raise ValueError(f"Некорректный шаблон логина {username_pattern!r}: {e}") from None
+        self.password_min = password_min
+        self.password_require = tuple(dict.fromkeys(password_require))
+        unknown = [name for name in self.password_require if name not in PASSWORD_CLASSES]
+        if unknown:
+            raise ValueError(
+                f"Неизвестные классы символов пароля: {', '.join(unknown)} "
+                f"(доступны: {', '.join(PASSWORD_CLASSES)})"
+            )
+        # Все требуемые классы — одно регулярное выражение с именованными группами,
+        # чтобы пароль просматривался один раз (классы не пересекаются)
+        self._classes = re.compile("|".join(
+            f"(?P<{name}>{PASSWORD_CLASSES[name][0]})" for name in self.password_require
+        )) if self.password_require else None
+        # Группа i соответствует биту i в маске найденных классов
+        self._class_errors = [
+            (1 << i, f"Пароль должен содержать {PASSWORD_CLASSES[name][1]}")
+            for i, name in enumerate(self.password_require, start=1)
+        ]
+        self._classes_all = sum(bit for bit, _ in self._class_errors)
+        self.blocked_names = frozenset(name.strip().lower() for name in blocked_names if name.strip())
+        self.breached = breached
+
+        self._username_length_error = (
+            f"Длина логина должна быть от {username_min} до {username_max} символов"
+        )
+        self._password_length_error = f"Пароль должен содержать минимум {password_min} символов"
+        # Описание символов известно только для шаблона по умолчанию
+        self._username_chars_error = (
+            "Логин может содержать только буквы, цифры и подчёркивание"
+            if username_pattern == DEFAULT_USERNAME_PATTERN
+            else "Логин содержит недопустимые символы"
+        )
+
+    @classmethod
+    def from_config(cls) -> "ValidationPolicy":
+        """Политика из Config; недоступные файлы списков пропускаются с ошибкой в логе."""
+        blocked = Config.BLOCKED_NAMES.split(",")
+        if Config.BLOCKED_NAMES_FILE:
+            try:
+                with open(Config.BLOCKED_NAMES_FILE, encoding="utf-8") as f:
+                    blocked += f.read().splitlines()
+            except OSError as e:
+                logger.error(f"Список запрещённых логинов не загружен: {str(e)}")
+        breached = None
+        if Config.BREACHED_PASSWORDS_FILE:
+            try:
+                breached = BloomFilter(Config.BREACHED_PASSWORDS_FILE)
+            except (OSError, ValueError) as e:
+                logger.error(f"Фильтр утёкших паролей не загружен: {str(e)}")
+        return cls(
+            username_min=Config.USERNAME_MIN_LENGTH,
+            username_max=Config.USERNAME_MAX_LENGTH,
+            username_pattern=Config.USERNAME_PATTERN,
+            password_min=Config.PASSWORD_MIN_LENGTH,
+            password_require=[name for name in Config.PASSWORD_REQUIRE.split(",") if name],
+            blocked_names=blocked,
+            breached=breached
+        )
+
+    def validate_username(self, username: str) -> Optional[str]:
+        if not self.username_min <= len(username) <= self.username_max:
+            return self._username_length_error
+        if self._username.fullmatch(username) is None:
+            return self._username_chars_error
+        if self.blocked_names and username.lower() in self.blocked_names:
+            return "Этот логин зарезервирован"
+        return None
+
+    def validate_password(self, password: str) -> Optional[str]:
+        if len(password) < self.password_min:
+            return self._password_length_error
+        if self._classes is not None:
+            # Один проход: выход, как только встретились все классы
+            found = 0
+            for match in self._classes.finditer(password):
+                found |= 1 << match.lastindex
+                if found == self._classes_all:
+                    break
+            else:
+                for bit, error in self._class_errors:
+                    if not found & bit:
+                        return error
+        # Кодирование нужно, только если пароль может превысить лимит (до 4 байт на символ)
+        if len(password) * 4 > BCRYPT_MAX_BYTES and len(password.encode()) > BCRYPT_MAX_BYTES:
+            return f"Пароль длиннее {BCRYPT_MAX_BYTES} байт"
+        if self.breached is not None and password in self.breached:
+            return "Этот пароль найден в утечках данных, выберите другой"
+        return None
+
+
+policy = ValidationPolicy.from_config()
+validate_username = policy.validate_username
+validate_password = policy.validate_password
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Сборка фильтра Блума утёкших паролей")
+    parser.add_argument("source", help="пароли или SHA-1 (HIBP), по одному в строке")
+    parser.add_argument("output")
+    parser.add_argument("--error-rate", type=float, default=0.001)
+    args = parser.parse_args()
+
+    with open(args.source, encoding="utf-8", errors="replace") as f:
+        count = sum(1 for line in f if line.strip())
+    with open(args.source, encoding="utf-8", errors="replace") as f:
+        digests = (digest for line in f if (digest := _line_digest(line)) is not None)
+        BloomFilter.build(digests, count, args.output, args.error_rate)
+    print(f"{args.output}: {count} записей")